@@ -1,16 +1,133 @@
-# database.py
+# dbconection.py
+import asyncio
+import os
+
+from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+
+from scripts.metrics import MongoCommandMetrics
+
+# La configuración se lee al importar: cargar .env antes
+load_dotenv()
 
 # URI de conexión a la base de datos MongoDB (local por defecto)
-MONGO_DETAILS = "mongodb://localhost:27017"
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "bqverde")
+
+# Pool de conexiones por proceso (cada worker de uvicorn tiene el suyo)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+# Tiempos de espera: fallar rápido en vez de colgar peticiones
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# primary, primaryPreferred, secondary, secondaryPreferred o nearest
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+# Compresión de red en orden de preferencia; se omiten las no instaladas
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+# Conexiones que se abren al arrancar, antes de declararse listo
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", str(MONGO_MIN_POOL_SIZE)))
+
+
+def available_compressors(names: str) -> list:
+    available = []
+    for name in (n.strip() for n in names.split(",")):
+        if name == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                continue
+        elif name == "snappy":
+            try:
+                import snappy  # noqa: F401
+            except ImportError:
+                continue
+        elif name != "zlib":
+            continue
+        available.append(name)
+    return available
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+        "appname": "bqverde-api",
+        "event_listeners": [MongoCommandMetrics()],
+    }
+    compressors = available_compressors(MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = compressors
+    return options
 
-# Cliente asíncrono para interactuar con MongoDB
-client = AsyncIOMotorClient(MONGO_DETAILS)
+
+# Cliente asíncrono único para toda la aplicación. Motor no conecta hasta la
+# primera operación; el lifespan de main.py lo verifica, crea los índices y
+# calienta el pool antes de aceptar tráfico, y lo cierra al terminar.
+client = AsyncIOMotorClient(MONGO_URI, **client_options())
 
 # Base de datos utilizada por la aplicación
-db = client.bqverde
+db = client[MONGO_DB]
 
 # Colecciones de la base de datos, utilizadas para operaciones CRUD
 user_collection = db["users"]          # Almacena información de los usuarios
 news_collection = db["news"]           # Almacena noticias
-document_collection = db["documents"]  # Almacena documentos generales
\ No newline at end of file
+document_collection = db["documents"]  # Almacena documentos generales
+station_collection = db["stations"]    # Almacena estaciones
+blob_collection = db["blobs"]          # Referencias a archivos por contenido
+job_collection = db["jobs"]            # Cola de tareas en segundo plano
+tombstone_collection = db["tombstones"] # Bajas para la sincronización incremental
+
+
+async def ensure_indexes(db) -> None:
+    """Crea los índices que necesitan las consultas de main.py (idempotente)."""
+    news, documents, stations, users = db["news"], db["documents"], db["stations"], db["users"]
+    # Listados paginados por keyset
+    await news.create_index([("created_at", -1), ("_id", -1)])
+    await news.create_index([("category", 1), ("created_at", -1), ("_id", -1)])
+    await documents.create_index([("name", 1), ("_id", 1)])
+    await stations.create_index([("name", 1), ("_id", 1)])
+    # Sincronización incremental (changed_since); los documentos anteriores
+    # al campo toman la fecha de creación (o la de su ObjectId)
+    for collection in (news, documents, stations):
+        await collection.update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": {"$ifNull": ["$created_at", {"$toDate": "$_id"}]}}}],
+        )
+        await collection.create_index([("updated_at", 1), ("_id", 1)])
+    # Comprobación de archivos compartidos antes de borrarlos
+    await news.create_index("img_url")
+    await documents.create_index("document_url")
+    # Estaciones anteriores al campo GeoJSON: se deriva de lon/lat
+    await stations.update_many(
+        {"location": {"$exists": False}},
+        [{"$set": {"location": {"type": "Point", "coordinates": ["$lon", "$lat"]}}}],
+    )
+    await stations.create_index([("location", "2dsphere")])
+    for field in ("username", "email"):
+        try:
+            await users.create_index(field, unique=True)
+        except OperationFailure as e:
+            print(f"Advertencia: no se pudo crear el índice único users.{field}: {e}")
+
+
+async def warm_up(db, connections: int = MONGO_WARMUP_CONNECTIONS) -> None:
+    """Abre `connections` conexiones del pool a la vez (pings concurrentes)."""
+    await asyncio.gather(*(db.command("ping") for _ in range(max(1, connections))))
+
+
+async def ping(db, timeout: float = 2.0) -> bool:
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout)
+        return True
+    except Exception:
+        return False
@@ -1,52 +1,115 @@
 # main.py
-from scripts.create_img import save_base64_image
-from scripts.create_doc import save_base64_document
-from fastapi import FastAPI, HTTPException, status, Depends, Request
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from scripts import media_io
+from dbconection import (
+    client, db, user_collection, news_collection, document_collection,
+    station_collection, blob_collection, job_collection, tombstone_collection, ensure_indexes, warm_up, ping,
+)
+from scripts.hashing import hash_pool, verify_password, get_password_hash
+from scripts.user_cache import user_cache, token_cache, invalidate_user, cache_stats
+from scripts.response_cache import ResponseCacheMiddleware, build_response_cache, path_namespace
+from scripts.static_files import CachedStaticFiles
+from scripts.blob_store import BlobStore
+from scripts.search_index import SearchIndex
+from scripts.geo_index import GridIndex, point
+from scripts.measurements import MeasurementStore, resolve_resolution
+from scripts.upload_stream import receive_multipart_document
+from scripts.pagination import fetch_page, keyset_find, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from scripts.bulk_import import import_ndjson, insert_many_unordered
+from scripts.upload_limit import UploadLimitMiddleware, MB
+from scripts.fast_json import (
+    render_page, render_list, list_projection, trusted_shape, sparse_shape, response_mode,
+)
+from scripts.news_summary import summarize
+from scripts.streaming import stream_list
+from scripts.compression import CompressionMiddleware
+from scripts.metrics import MetricsMiddleware, LoopLagMonitor, register_pools, registry
+from scripts.profiler import SlowRequestProfiler
+from scripts.jobs import JobQueue
+from scripts.orphans import OrphanSweeper, ORPHAN_SWEEP_INTERVAL_S
+from scripts.create_doc import is_precompressible
+from scripts.versioning import INITIAL_VERSION, version_etag, parse_if_match, match_filter, next_version
+from scripts.events import EventBroker, parse_topics, EVENTS_HEARTBEAT_S
+from scripts.delta_sync import DeltaSync, SyncTokenExpired, MAX_SYNC_PAGE_SIZE
+from fastapi import FastAPI, HTTPException, status, Depends, Request, Query, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from models.models import *
+from pydantic import ValidationError
+from pymongo import ReturnDocument
 from dotenv import load_dotenv
 from bson import ObjectId
 from datetime import datetime, timedelta
-from typing import List, Optional
-from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 import os
 import asyncio
-from uvicorn.config import Config
-from uvicorn.server import Server
 
 # Cargar variables de entorno
 load_dotenv()
 
-app = FastAPI(title="Sistema de News & Documents")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque (índices y calentamiento) y parada ordenada; ver CICLO DE VIDA."""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+app = FastAPI(title="Sistema de News & Documents", lifespan=lifespan)
+app.state.ready = False
+
+# Límite de tamaño del cuerpo por ruta, contado sobre los bytes recibidos.
+# Noticias: imagen de hasta 5 MB en base64 (~6,7 MB) más los campos de texto.
+NEWS_BODY_LIMIT = 8 * MB
+DOCUMENT_BODY_LIMIT = 50 * MB
+# Importaciones NDJSON: cada línea se limita como su alta individual y la
+# memoria, por lotes (bulk_import.BULK_IMPORT_BATCH_BYTES); el total solo
+# acota la duración de la petición (0 = sin límite)
+IMPORT_BODY_LIMIT = int(os.getenv("IMPORT_BODY_LIMIT_MB", "512")) * MB or None
+STATION_IMPORT_LINE_LIMIT = 64 * 1024
+app.add_middleware(
+    UploadLimitMiddleware,
+    default_limit=50 * MB,
+    limits={
+        "/news": NEWS_BODY_LIMIT,
+        "/news/import": IMPORT_BODY_LIMIT,
+        "/documents": DOCUMENT_BODY_LIMIT,
+        "/documents/import": IMPORT_BODY_LIMIT,
+        "/stations/import": IMPORT_BODY_LIMIT,
+    },
+)
+
+# Caché de respuestas (ETag / 304) para las rutas públicas de lectura
+response_cache = build_response_cache()
 
-# Middleware para limitar tamaño de subidas (50 MB)
-class LimitUploadSizeMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_upload_size: int = 50 * 1024 * 1024):
-        super().__init__(app)
-        self.max_upload_size = max_upload_size
+def measurements_namespace(station_id: str) -> str:
+    return f"measurements/{station_id}"
 
-    async def dispatch(self, request: Request, call_next):
-        content_length = request.headers.get("content-length")
-        if content_length and int(content_length) > self.max_upload_size:
-            return JSONResponse(
-                status_code=413,
-                content={"detail": "File too large (max 50 MB)"},
-            )
-        return await call_next(request)
+def cache_namespace(path: str) -> str:
+    # Series de mediciones: espacio propio por estación, así la ingesta no
+    # vacía los listados de estaciones ni las series de las demás
+    parts = path.strip("/").split("/")
+    if len(parts) == 3 and parts[0] == "stations" and parts[2] == "measurements":
+        return measurements_namespace(parts[1])
+    return path_namespace(path)
+
+app.add_middleware(
+    ResponseCacheMiddleware,
+    cache=response_cache,
+    prefixes=("/news", "/documents", "/stations", "/search"),
+    namespace_of=cache_namespace,
+)
 
-app.add_middleware(LimitUploadSizeMiddleware)
+# Compresión br/gzip de las respuestas JSON (fuera de la caché: guarda el original)
+app.add_middleware(CompressionMiddleware)
 
 # Servir archivos estáticos (imágenes y documentos)
 os.makedirs("uploads/news", exist_ok=True)
 os.makedirs("uploads/documents", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", CachedStaticFiles(directory="uploads"), name="uploads")
 
 # Configuración de CORS
 app.add_middleware(
@@ -57,33 +120,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas (Prometheus en /metrics) y perfilado de peticiones lentas
+slow_request_profiler = SlowRequestProfiler()
+loop_lag_monitor = LoopLagMonitor()
+register_pools([media_io.media_pool, media_io.image_pool, hash_pool])
+app.add_middleware(MetricsMiddleware, router=app.router, profiler=slow_request_profiler)
+
 # Configuración de autenticación
 SECRET_KEY = os.getenv("SECRET_KEY", "una-clave-secreta-muy-larga-y-segura-1234567890")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-# Conexión a MongoDB
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URI)
-db = client["bqverde"]
-
-# Colecciones
-user_collection = db["users"]
-news_collection = db["news"]
-document_collection = db["documents"]
-station_collection = db["stations"]
+blob_store = BlobStore(blob_collection)
+search_index = SearchIndex(db["search_postings"], db["search_docs"], db["search_stats"])
+station_geo_index = GridIndex()
+# Post-procesado de archivos y borrados, con reintentos (ver TAREAS EN SEGUNDO PLANO)
+job_queue = JobQueue(job_collection)
+orphan_sweeper = OrphanSweeper(news_collection, document_collection, blob_collection)
+# Avisos de cambios para /events (change stream o publicación local)
+event_broker = EventBroker(db)
+# Altas, cambios y bajas desde un token (?changed_since=, ver SINCRONIZACIÓN)
+delta_sync = DeltaSync(tombstone_collection)
+measurement_store = MeasurementStore(db)
+
+# === CICLO DE VIDA ===
+
+async def startup():
+    """
+    Verifica la conexión a Mongo, crea los índices y calienta el pool de
+    conexiones, los pools de trabajo y el índice de estaciones. Hasta que
+    termina, /health/ready responde 503 y el balanceador no envía tráfico.
+    """
+    loop_lag_monitor.start()
+    slow_request_profiler.start()
+    await ensure_indexes(db)
+    await search_index.create_indexes()
+    await measurement_store.create_collections()
+    await job_queue.create_indexes()
+    await delta_sync.create_indexes()
+    await job_queue.schedule("orphan_sweep", ORPHAN_SWEEP_INTERVAL_S)
+    await asyncio.gather(
+        warm_up(db),
+        media_io.media_pool.warm_up(),
+        media_io.image_pool.warm_up(),
+        hash_pool.warm_up(),
+        station_geo_index.ensure_fresh(station_collection),
+    )
+    job_queue.start()
+    await event_broker.start()
+    app.state.ready = True
+
+async def shutdown():
+    """Deja de aceptar tráfico, espera a las tareas y operaciones de disco en curso y cierra Mongo."""
+    app.state.ready = False
+    await event_broker.stop()
+    await job_queue.stop()
+    await loop_lag_monitor.stop()
+    slow_request_profiler.stop()
+    media_io.media_pool.shutdown(wait=True)
+    media_io.image_pool.shutdown(wait=True)
+    hash_pool.shutdown(wait=True)
+    client.close()
 
 # === UTILIDADES DE AUTENTICACIÓN ===
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (
@@ -98,24 +200,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        token_cache.set(token, payload, expires_at=payload.get("exp"))
+    username: str = payload.get("sub")
+    if username is None:
         raise credentials_exception
-    user = await user_collection.find_one({"username": username})
+
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
-    return user
+        user = await user_collection.find_one({"username": username})
+        if user is None:
+            raise credentials_exception
+        user_cache.set(username, user)
+    return dict(user)
 
 # === ENDPOINTS DE AUTENTICACIÓN ===
 
 @app.post("/login", response_model=dict)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await user_collection.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await verify_password(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas",
@@ -127,131 +236,359 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+# === TAREAS EN SEGUNDO PLANO ===
+# Manejadores de job_queue. Se ejecutan fuera de las peticiones, con
+# reintentos, y deben ser idempotentes: comprueban el estado al ejecutarse.
+
+@job_queue.handler("news_image_variants")
+async def build_image_variants(payload: dict):
+    img_url = payload["img_url"]
+    if not await news_collection.count_documents({"img_url": img_url}, limit=1):
+        return
+    # Imagen ya procesada para otra noticia (mismo hash): se reutilizan sus variantes
+    existing = await news_collection.find_one(
+        {"img_url": img_url, "img_variants.0": {"$exists": True}}, {"img_variants": 1}
+    )
+    variants = existing["img_variants"] if existing else await media_io.build_news_image_variants(img_url)
+    # Cambia la representación: nueva versión (ETag) en cada noticia afectada
+    result = await news_collection.update_many(
+        {"img_url": img_url, "img_variants": []},
+        {"$set": {"img_variants": variants, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}},
+    )
+    if result.modified_count:
+        await response_cache.invalidate("news")
+        if event_broker.local:
+            ids = await news_collection.distinct("_id", {"img_url": img_url, "img_variants": variants})
+            event_broker.notify("news", "updated", ids)
+
+async def news_image_in_use(img_url: str) -> bool:
+    return bool(await news_collection.count_documents({"img_url": img_url}, limit=1))
+
+async def document_file_in_use(payload: dict) -> bool:
+    # Entre la liberación y la tarea otro documento pudo subir el mismo contenido
+    if payload.get("sha256") and await blob_store.is_referenced(payload["sha256"]):
+        return True
+    return bool(await document_collection.count_documents({"document_url": payload["url"]}, limit=1))
+
+async def retire_unused_file(kind: str, payload: dict, path: str, in_use) -> Optional[str]:
+    """
+    Aparta el archivo si nada lo usa (ver media_io.retire_file) y vuelve a
+    comprobarlo ya apartado, cuando una subida concurrente no puede
+    reutilizarlo. Devuelve la ruta apartada para borrarla, o None si el
+    archivo sigue en uso; si se modificó hace poco la tarea se reprograma.
+    """
+    if await in_use():
+        return None
+    trash = await media_io.retire_file(path)
+    if trash is None:
+        if await media_io.run_io(os.path.exists, path):
+            await job_queue.enqueue(kind, payload, delay_s=media_io.FILE_DELETE_GRACE_S)
+        return None
+    if await in_use():
+        await media_io.restore_file(trash, path)
+        return None
+    return trash
+
+@job_queue.handler("delete_news_image")
+async def delete_news_image(payload: dict):
+    img_url = payload["img_url"]
+    trash = await retire_unused_file(
+        "delete_news_image", payload, f".{img_url}", lambda: news_image_in_use(img_url)
+    )
+    if trash is not None:
+        await media_io.purge_news_image(trash, img_url)
+
+@job_queue.handler("precompress_document")
+async def precompress_document(payload: dict):
+    await media_io.precompress_document(f".{payload['url']}")
+
+@job_queue.handler("delete_document_file")
+async def delete_document_file(payload: dict):
+    path = f".{payload['url']}"
+    trash = await retire_unused_file(
+        "delete_document_file", payload, path, lambda: document_file_in_use(payload)
+    )
+    if trash is not None:
+        await media_io.purge_document_file(trash, path)
+
+@job_queue.handler("orphan_sweep")
+async def sweep_orphans(payload: dict):
+    await orphan_sweeper.run()
+
+# === ESCRITURAS CONDICIONALES ===
+
+async def raise_if_conflict(collection, doc_id: ObjectId, versions: Optional[List[int]]):
+    """
+    Tras una escritura condicional (If-Match) sin efecto: si el documento
+    existe es que la versión no coincidía (412); si no, decide el llamador.
+    """
+    if versions is not None and await collection.count_documents({"_id": doc_id}, limit=1):
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Version conflict")
+
+# === SINCRONIZACIÓN INCREMENTAL ===
+# GET /news/changes, /documents/changes y /stations/changes: sin
+# changed_since, todo; con él, solo lo creado, modificado o borrado después.
+# El cliente guarda sync_token y repite mientras has_more sea true.
+
+CHANGED_SINCE_QUERY = Query(None, description="sync_token de la respuesta anterior (vacío: sincronización completa)")
+SYNC_LIMIT_QUERY = Query(MAX_PAGE_SIZE, ge=1, le=MAX_SYNC_PAGE_SIZE)
+
+async def sync_page(page_model, model, collection, kind: str, changed_since: Optional[str], limit: int):
+    try:
+        rows, deleted, sync_token, has_more = await delta_sync.changes(
+            collection, kind, changed_since, limit, list_projection(model)
+        )
+    except SyncTokenExpired:
+        raise HTTPException(status_code=410, detail="Sync token expired, full resync required")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return render_page(page_model, model, rows, deleted=deleted, sync_token=sync_token, has_more=has_more)
+
 # === ENDPOINTS DE NOTICIAS ===
 
+async def release_news_image(news: dict):
+    """
+    Programa el borrado de la imagen de una noticia y sus variantes; la tarea
+    lo descarta si otra noticia usa el mismo archivo (nombre = hash del contenido).
+    """
+    if news.get("img_url"):
+        await job_queue.enqueue("delete_news_image", {"img_url": news["img_url"]})
+
+async def schedule_image_variants(news_list: List[dict]):
+    """Programa la generación de variantes de las imágenes nuevas."""
+    urls = dict.fromkeys(n["img_url"] for n in news_list if n.get("img_url"))
+    await job_queue.enqueue_many("news_image_variants", [{"img_url": url} for url in urls])
+
 @app.post("/news", response_model=NewsInDB, status_code=status.HTTP_201_CREATED)
 async def create_news(news: NewsCreate, current_user: dict = Depends(get_current_user)):
     news_dict = news.dict()
 
-    # Procesar imagen si se envía en base64
+    # Procesar imagen si se envía en base64 (original sin metadatos + variantes)
     if news_dict.get("img_url"):
         try:
-            image_url = save_base64_image(news_dict["img_url"])
+            image = await media_io.save_news_image(news_dict["img_url"])
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error saving image: {str(e)}")
-        news_dict["img_url"] = image_url
+        news_dict.update(image)
     else:
         news_dict["img_url"] = None
+        news_dict["img_variants"] = []
 
+    news_dict.update(summarize(news_dict["content"]))
     now = datetime.utcnow()
     news_dict["created_at"] = now
     news_dict["updated_at"] = now
+    news_dict["version"] = INITIAL_VERSION
 
     result = await news_collection.insert_one(news_dict)
     news_dict["_id"] = str(result.inserted_id)
 
-    # Renombrar imagen con el ID del documento (mejor gestión de archivos)
-    if news_dict["img_url"]:
-        old_path = f".{news_dict['img_url']}"
-        extension = Path(old_path).suffix
-        new_filename = f"{news_dict['_id']}{extension}"
-        new_path = Path("uploads/news") / new_filename
+    await schedule_image_variants([news_dict])
+    await search_index.index("news", news_dict)
+    await response_cache.invalidate("news", "search")
+    event_broker.notify("news", "created", [news_dict["_id"]], INITIAL_VERSION)
+    return NewsInDB(**news_dict)
 
+async def prepare_imported_news(news_dict: dict) -> dict:
+    if news_dict.get("img_url"):
         try:
-            os.rename(old_path, new_path)
-            final_url = f"/uploads/news/{new_filename}"
-            await news_collection.update_one(
-                {"_id": result.inserted_id},
-                {"$set": {"img_url": final_url}}
-            )
-            news_dict["img_url"] = final_url
+            news_dict.update(await media_io.save_news_image(news_dict["img_url"]))
         except Exception as e:
-            print(f"Advertencia: no se pudo renombrar la imagen: {e}")
-
-    return NewsInDB(**news_dict)
-
-@app.get("/news", response_model=List[NewsInDB])
-async def list_news(category: Optional[str] = None):
+            raise ValueError(f"Error saving image: {str(e)}")
+    else:
+        news_dict["img_url"] = None
+        news_dict["img_variants"] = []
+    news_dict.update(summarize(news_dict["content"]))
+    now = datetime.utcnow()
+    news_dict["created_at"] = now
+    news_dict["updated_at"] = now
+    news_dict["version"] = INITIAL_VERSION
+    return news_dict
+
+async def commit_imported_news(docs: List[dict]):
+    failures = await insert_many_unordered(news_collection, docs)
+    for index in failures:
+        await release_news_image(docs[index])
+    inserted = [d for i, d in enumerate(docs) if i not in failures]
+    await schedule_image_variants(inserted)
+    await search_index.index_many("news", inserted)
+    event_broker.notify("news", "created", [d["_id"] for d in inserted], INITIAL_VERSION)
+    return failures
+
+@app.post("/news/import", response_model=ImportResult)
+async def import_news(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Importación masiva en NDJSON (un NewsCreate por línea). Las líneas válidas
+    se insertan por lotes; las inválidas se devuelven con su número de línea.
+    """
+    try:
+        report = await import_ndjson(
+            request.stream(), NewsCreate, prepare_imported_news, commit_imported_news,
+            max_line_bytes=NEWS_BODY_LIMIT,
+        )
+    finally:
+        await response_cache.invalidate("news", "search")
+    return report.as_dict()
+
+# Listados completos en streaming (?stream=json|ndjson): todas las filas
+# desde `cursor`, sin página ni next_cursor; `limit` no se aplica.
+STREAM_QUERY = Query(None, description="Listado completo en streaming: array JSON o NDJSON")
+
+@app.get("/news", response_model=NewsPage)
+async def list_news(
+    category: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: Optional[Literal["json", "ndjson"]] = STREAM_QUERY,
+    view: Literal["full", "summary"] = Query("full", description="summary: sin content, con extracto y tiempo de lectura"),
+    fields: Optional[str] = Query(None, description="Campos separados por comas, p. ej. title,img_url,created_at"),
+):
+    """
+    Con view=summary o fields= solo se leen de Mongo los campos pedidos (el
+    cuerpo `content` ni se lee ni se valida); `fields` se aplica sobre la vista.
+    """
     query = {"category": category} if category else {}
-    news_list = []
-    async for n in news_collection.find(query).sort("created_at", -1):
-        n["_id"] = str(n["_id"])
-        news_list.append(NewsInDB(**n))
-    return news_list
+    model = NewsSummary if view == "summary" else NewsInDB
+    try:
+        shape = sparse_shape(model, fields) if fields else None
+        if shape is not None:
+            projection = {**shape.projection(), "created_at": 1}  # necesario para el cursor
+        elif view == "summary":
+            projection = trusted_shape(NewsSummary).projection()
+        else:
+            projection = list_projection(NewsInDB)
+        if stream:
+            rows = keyset_find(news_collection, query, "created_at", True, cursor, projection)
+            return stream_list(model, rows, stream, shape)
+        docs, next_cursor = await fetch_page(
+            news_collection, query, "created_at", True, cursor, limit, projection
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if shape is None and view == "full":
+        return render_page(NewsPage, NewsInDB, docs, next_cursor=next_cursor)
+    # Forma distinta de NewsPage: se serializa aquí, sin pasar por response_model
+    page_model = NewsSummaryPage if view == "summary" else NewsPage
+    return render_page(page_model, model, docs, mode=response_mode(), shape=shape, next_cursor=next_cursor)
+
+@app.get("/news/changes", response_model=NewsChanges)
+async def news_changes(changed_since: Optional[str] = CHANGED_SINCE_QUERY, limit: int = SYNC_LIMIT_QUERY):
+    return await sync_page(NewsChanges, NewsInDB, news_collection, "news", changed_since, limit)
 
 @app.get("/news/{news_id}", response_model=NewsInDB)
-async def get_news(news_id: str):
+async def get_news(news_id: str, response: Response):
     if not ObjectId.is_valid(news_id):
         raise HTTPException(status_code=400, detail="Invalid news ID")
     news = await news_collection.find_one({"_id": ObjectId(news_id)})
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
     news["_id"] = str(news["_id"])
+    response.headers["ETag"] = version_etag(news.get("version"))
     return NewsInDB(**news)
 
 @app.put("/news/{news_id}", response_model=NewsInDB)
 async def update_news(
     news_id: str,
     news_update: NewsUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     if not ObjectId.is_valid(news_id):
         raise HTTPException(status_code=400, detail="Invalid news ID")
 
-    existing = await news_collection.find_one({"_id": ObjectId(news_id)})
-    if not existing:
-        raise HTTPException(status_code=404, detail="News not found")
-
     update_data = {k: v for k, v in news_update.dict(exclude_unset=True).items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    # Manejo de nueva imagen
-    if "img_url" in update_data and update_data["img_url"]:
-        base64_str = update_data["img_url"]
+    # Nueva imagen: se guarda antes de actualizar; la anterior se libera
+    # después, con el documento previo que devuelve la propia actualización
+    new_image = None
+    if update_data.get("img_url"):
         try:
-            new_image_url = save_base64_image(base64_str)
+            new_image = await media_io.save_news_image(update_data["img_url"])
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error saving image: {str(e)}")
+        update_data.update(new_image)
 
-        # Eliminar imagen anterior
-        old_url = existing.get("img_url")
-        if old_url and os.path.exists(f".{old_url}"):
-            os.remove(f".{old_url}")
-
-        # Renombrar nueva imagen con ID del documento
-        old_path = f".{new_image_url}"
-        ext = Path(old_path).suffix
-        new_filename = f"{news_id}{ext}"
-        new_path = Path("uploads/news") / new_filename
-        try:
-            os.rename(old_path, new_path)
-            update_data["img_url"] = f"/uploads/news/{new_filename}"
-        except Exception as e:
-            update_data["img_url"] = new_image_url  # fallback
-
+    if "content" in update_data:
+        update_data.update(summarize(update_data["content"]))
     update_data["updated_at"] = datetime.utcnow()
 
-    await news_collection.update_one({"_id": ObjectId(news_id)}, {"$set": update_data})
-    updated = await news_collection.find_one({"_id": ObjectId(news_id)})
-    updated["_id"] = str(updated["_id"])
+    versions = parse_if_match(if_match)
+    before = await news_collection.find_one_and_update(
+        match_filter(ObjectId(news_id), versions),
+        {"$set": update_data, "$inc": {"version": 1}},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        if new_image:
+            await release_news_image(new_image)
+        await raise_if_conflict(news_collection, ObjectId(news_id), versions)
+        raise HTTPException(status_code=404, detail="News not found")
+    if new_image:
+        await schedule_image_variants([new_image])
+        if before.get("img_url") != new_image["img_url"]:
+            await release_news_image(before)
+
+    # Documento resultante = anterior + cambios, sin una segunda lectura
+    updated = {**before, **update_data, "_id": news_id, "version": next_version(before)}
+    await search_index.index("news", updated)
+    await response_cache.invalidate("news", "search")
+    event_broker.notify("news", "updated", [news_id], updated["version"])
+    response.headers["ETag"] = version_etag(updated["version"])
     return NewsInDB(**updated)
 
 @app.delete("/news/{news_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_news(news_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_news(
+    news_id: str,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     if not ObjectId.is_valid(news_id):
         raise HTTPException(status_code=400, detail="Invalid news ID")
-    news = await news_collection.find_one({"_id": ObjectId(news_id)})
+    versions = parse_if_match(if_match)
+    news = await news_collection.find_one_and_delete(match_filter(ObjectId(news_id), versions))
     if not news:
+        await raise_if_conflict(news_collection, ObjectId(news_id), versions)
         raise HTTPException(status_code=404, detail="News not found")
 
-    if news.get("img_url") and os.path.exists(f".{news['img_url']}"):
-        os.remove(f".{news['img_url']}")
-
-    await news_collection.delete_one({"_id": ObjectId(news_id)})
+    await delta_sync.record_deletion("news", news_id)
+    await release_news_image(news)
+    await search_index.remove("news", news_id)
+    await response_cache.invalidate("news", "search")
+    event_broker.notify("news", "deleted", [news_id])
 
 # === ENDPOINTS DE DOCUMENTOS ===
 
+async def insert_document_with_blob(doc_dict: dict):
+    """Inserta el documento registrando antes la referencia a su archivo."""
+    await blob_store.acquire(doc_dict["sha256"], doc_dict["document_url"], doc_dict["size"])
+    try:
+        return await document_collection.insert_one(doc_dict)
+    except Exception:
+        await release_document_blob(doc_dict)
+        raise
+
+async def release_document_blob(doc: dict):
+    """
+    Libera la referencia del documento a su archivo y, si era la última,
+    programa su borrado del disco (junto con sus variantes precomprimidas).
+    """
+    if doc.get("sha256"):
+        url = await blob_store.release(doc["sha256"])
+    else:
+        # Documentos anteriores al almacenamiento por contenido: la tarea
+        # comprueba que ningún otro documento use la misma URL
+        url = doc.get("document_url")
+    if url:
+        await job_queue.enqueue("delete_document_file", {"url": url, "sha256": doc.get("sha256")})
+
+async def schedule_precompression(docs: List[dict]):
+    """Programa las variantes .gz/.br de los documentos de texto."""
+    urls = dict.fromkeys(d["document_url"] for d in docs if is_precompressible(d["document_url"]))
+    await job_queue.enqueue_many("precompress_document", [{"url": url} for url in urls])
+
 @app.post("/documents", response_model=DocumentInDB, status_code=status.HTTP_201_CREATED)
 async def create_document(doc: DocumentCreate, current_user: dict = Depends(get_current_user)):
     doc_dict = doc.dict()
@@ -263,37 +600,146 @@ async def create_document(doc: DocumentCreate, current_user: dict = Depends(get_
         )
 
     try:
-        doc_dict["document_url"] = save_base64_document(doc_dict["document_url"])
+        stored = await media_io.save_document(doc_dict["document_url"])
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid document: {str(e)}")
 
-    doc_dict["created_at"] = datetime.utcnow()
-    result = await document_collection.insert_one(doc_dict)
+    doc_dict["document_url"] = stored["url"]
+    doc_dict["sha256"] = stored["sha256"]
+    doc_dict["size"] = stored["size"]
+    doc_dict["created_at"] = doc_dict["updated_at"] = datetime.utcnow()
+    doc_dict["version"] = INITIAL_VERSION
+    result = await insert_document_with_blob(doc_dict)
     doc_dict["_id"] = str(result.inserted_id)
+    await schedule_precompression([doc_dict])
+    await search_index.index("documents", doc_dict)
+    await response_cache.invalidate("documents", "search")
+    event_broker.notify("documents", "created", [doc_dict["_id"]], INITIAL_VERSION)
     return DocumentInDB(**doc_dict)
 
-@app.get("/documents", response_model=List[DocumentInDB])
-async def list_documents():
-    docs = []
-    async for d in document_collection.find().sort("name", 1):
-        d["_id"] = str(d["_id"])
-        docs.append(DocumentInDB(**d))
-    return docs
+# Campos de texto del formulario de subida (document_url lo pone el servidor)
+UPLOAD_FORM_FIELDS = frozenset(DocumentCreate.model_fields) - {"document_url"}
+
+async def abandon_document_file(stored):
+    """
+    Archivo subido que no llega a tener documento: se programa su borrado
+    (la tarea comprueba si otro documento con el mismo contenido lo usa).
+    """
+    await job_queue.enqueue("delete_document_file", {"url": stored.url, "sha256": stored.sha256})
+
+@app.post("/documents/upload", response_model=DocumentInDB, status_code=status.HTTP_201_CREATED)
+async def upload_document(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Sube un documento como multipart/form-data (campo `file` más los campos de
+    DocumentBase). El archivo se escribe a disco por trozos mientras llega.
+    """
+    try:
+        fields, stored = await receive_multipart_document(
+            request, allowed_fields=UPLOAD_FORM_FIELDS, on_abandoned=abandon_document_file
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid document: {str(e)}")
+
+    # Hasta que el insert registra la referencia, cualquier error deja el
+    # archivo sin dueño
+    try:
+        try:
+            doc = DocumentCreate(**fields, document_url=stored.url)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        doc_dict = doc.dict()
+        doc_dict["size"] = stored.size
+        doc_dict["sha256"] = stored.sha256
+        doc_dict["created_at"] = doc_dict["updated_at"] = datetime.utcnow()
+        doc_dict["version"] = INITIAL_VERSION
+        result = await insert_document_with_blob(doc_dict)
+    except BaseException:
+        await abandon_document_file(stored)
+        raise
+    doc_dict["_id"] = str(result.inserted_id)
+    await schedule_precompression([doc_dict])
+    await search_index.index("documents", doc_dict)
+    await response_cache.invalidate("documents", "search")
+    event_broker.notify("documents", "created", [doc_dict["_id"]], INITIAL_VERSION)
+    return DocumentInDB(**doc_dict)
+
+async def prepare_imported_document(doc_dict: dict) -> dict:
+    if not doc_dict["document_url"].startswith(("data:application/", "data:text/")):
+        raise ValueError("document_url must be a base64 string with 'data:application/...' or 'data:text/...' prefix")
+    try:
+        stored = await media_io.save_document(doc_dict["document_url"])
+    except Exception as e:
+        raise ValueError(f"Invalid document: {str(e)}")
+    doc_dict["document_url"] = stored["url"]
+    doc_dict["sha256"] = stored["sha256"]
+    doc_dict["size"] = stored["size"]
+    doc_dict["created_at"] = doc_dict["updated_at"] = datetime.utcnow()
+    doc_dict["version"] = INITIAL_VERSION
+    return doc_dict
+
+async def commit_imported_documents(docs: List[dict]):
+    await blob_store.acquire_many(
+        [{"sha256": d["sha256"], "url": d["document_url"], "size": d["size"]} for d in docs]
+    )
+    failures = await insert_many_unordered(document_collection, docs)
+    for index in failures:
+        await release_document_blob(docs[index])
+    inserted = [d for i, d in enumerate(docs) if i not in failures]
+    await schedule_precompression(inserted)
+    await search_index.index_many("documents", inserted)
+    event_broker.notify("documents", "created", [d["_id"] for d in inserted], INITIAL_VERSION)
+    return failures
+
+@app.post("/documents/import", response_model=ImportResult)
+async def import_documents(request: Request, current_user: dict = Depends(get_current_user)):
+    """Importación masiva en NDJSON (un DocumentCreate por línea, archivo en base64)."""
+    try:
+        report = await import_ndjson(
+            request.stream(), DocumentCreate, prepare_imported_document, commit_imported_documents,
+            max_line_bytes=DOCUMENT_BODY_LIMIT,
+        )
+    finally:
+        await response_cache.invalidate("documents", "search")
+    return report.as_dict()
+
+@app.get("/documents", response_model=DocumentPage)
+async def list_documents(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: Optional[Literal["json", "ndjson"]] = STREAM_QUERY,
+):
+    try:
+        if stream:
+            rows = keyset_find(document_collection, {}, "name", False, cursor, list_projection(DocumentInDB))
+            return stream_list(DocumentInDB, rows, stream)
+        rows, next_cursor = await fetch_page(
+            document_collection, {}, "name", False, cursor, limit, list_projection(DocumentInDB)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return render_page(DocumentPage, DocumentInDB, rows, next_cursor=next_cursor)
+
+@app.get("/documents/changes", response_model=DocumentChanges)
+async def document_changes(changed_since: Optional[str] = CHANGED_SINCE_QUERY, limit: int = SYNC_LIMIT_QUERY):
+    return await sync_page(DocumentChanges, DocumentInDB, document_collection, "documents", changed_since, limit)
 
 @app.get("/documents/{doc_id}", response_model=DocumentInDB)
-async def get_document(doc_id: str):
+async def get_document(doc_id: str, response: Response):
     if not ObjectId.is_valid(doc_id):
         raise HTTPException(status_code=400, detail="Invalid document ID")
     doc = await document_collection.find_one({"_id": ObjectId(doc_id)})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     doc["_id"] = str(doc["_id"])
+    response.headers["ETag"] = version_etag(doc.get("version"))
     return DocumentInDB(**doc)
 
 @app.put("/documents/{doc_id}", response_model=DocumentInDB)
 async def update_document(
     doc_id: str,
     doc_update: DocumentUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     if not ObjectId.is_valid(doc_id):
@@ -303,52 +749,187 @@ async def update_document(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    result = await document_collection.update_one({"_id": ObjectId(doc_id)}, {"$set": update_data})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Document not found")
+    # Nuevo archivo: se almacena por contenido y se libera el anterior
+    stored = None
+    if "document_url" in update_data:
+        if not update_data["document_url"].startswith(("data:application/", "data:text/")):
+            raise HTTPException(
+                status_code=400,
+                detail="document_url must be a base64 string with 'data:application/...' or 'data:text/...' prefix"
+            )
+        try:
+            stored = await media_io.save_document(update_data["document_url"])
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid document: {str(e)}")
+        await blob_store.acquire(stored["sha256"], stored["url"], stored["size"])
+        update_data["document_url"] = stored["url"]
+        update_data["sha256"] = stored["sha256"]
+        update_data["size"] = stored["size"]
+    update_data["updated_at"] = datetime.utcnow()
 
-    updated = await document_collection.find_one({"_id": ObjectId(doc_id)})
-    updated["_id"] = str(updated["_id"])
+    versions = parse_if_match(if_match)
+    try:
+        before = await document_collection.find_one_and_update(
+            match_filter(ObjectId(doc_id), versions),
+            {"$set": update_data, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            await raise_if_conflict(document_collection, ObjectId(doc_id), versions)
+            raise HTTPException(status_code=404, detail="Document not found")
+    except BaseException:
+        # Sin actualización (conflicto, inexistente o error): la nueva
+        # referencia no la usa nadie
+        if stored:
+            await release_document_blob(update_data)
+        raise
+    if stored:
+        await schedule_precompression([update_data])
+        await release_document_blob(before)
+
+    updated = {**before, **update_data, "_id": doc_id, "version": next_version(before)}
+    await search_index.index("documents", updated)
+    await response_cache.invalidate("documents", "search")
+    event_broker.notify("documents", "updated", [doc_id], updated["version"])
+    response.headers["ETag"] = version_etag(updated["version"])
     return DocumentInDB(**updated)
 
 @app.delete("/documents/{doc_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_document(doc_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_document(
+    doc_id: str,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     if not ObjectId.is_valid(doc_id):
         raise HTTPException(status_code=400, detail="Invalid document ID")
-    await document_collection.delete_one({"_id": ObjectId(doc_id)})
+    versions = parse_if_match(if_match)
+    doc = await document_collection.find_one_and_delete(match_filter(ObjectId(doc_id), versions))
+    if doc:
+        await delta_sync.record_deletion("documents", doc_id)
+        await release_document_blob(doc)
+        await search_index.remove("documents", doc_id)
+        event_broker.notify("documents", "deleted", [doc_id])
+    else:
+        await raise_if_conflict(document_collection, ObjectId(doc_id), versions)
+    await response_cache.invalidate("documents", "search")
 
 # === ENDPOINTS DE ESTACIONES ===
 
 @app.post("/stations", response_model=StationInDB, status_code=status.HTTP_201_CREATED)
 async def create_station(station: StationCreate, current_user: dict = Depends(get_current_user)):
     station_dict = station.dict()
-    station_dict["created_at"] = datetime.utcnow()
+    station_dict["location"] = point(station_dict["lon"], station_dict["lat"])
+    station_dict["created_at"] = station_dict["updated_at"] = datetime.utcnow()
+    station_dict["version"] = INITIAL_VERSION
     result = await station_collection.insert_one(station_dict)
     station_dict["_id"] = str(result.inserted_id)
+    station_dict.pop("location")
+    station_geo_index.upsert(station_dict)
+    await response_cache.invalidate("stations")
+    event_broker.notify("stations", "created", [station_dict["_id"]], INITIAL_VERSION)
     return StationInDB(**station_dict)
 
-@app.get("/stations", response_model=List[StationInDB])
-async def list_stations():
-    stations = []
-    async for s in station_collection.find().sort("name", 1):
-        s["_id"] = str(s["_id"])
-        stations.append(StationInDB(**s))
-    return stations
+async def prepare_imported_station(station_dict: dict) -> dict:
+    station_dict["location"] = point(station_dict["lon"], station_dict["lat"])
+    station_dict["created_at"] = station_dict["updated_at"] = datetime.utcnow()
+    station_dict["version"] = INITIAL_VERSION
+    return station_dict
+
+async def commit_imported_stations(docs: List[dict]):
+    failures = await insert_many_unordered(station_collection, docs)
+    for index, doc in enumerate(docs):
+        if index not in failures:
+            station = {k: v for k, v in doc.items() if k != "location"}
+            station["_id"] = str(station["_id"])
+            station_geo_index.upsert(station)
+    event_broker.notify(
+        "stations", "created", [d["_id"] for i, d in enumerate(docs) if i not in failures], INITIAL_VERSION
+    )
+    return failures
+
+@app.post("/stations/import", response_model=ImportResult)
+async def import_stations(request: Request, current_user: dict = Depends(get_current_user)):
+    """Importación masiva en NDJSON (un StationCreate por línea)."""
+    try:
+        report = await import_ndjson(
+            request.stream(), StationCreate, prepare_imported_station, commit_imported_stations,
+            max_line_bytes=STATION_IMPORT_LINE_LIMIT,
+        )
+    finally:
+        await response_cache.invalidate("stations")
+    return report.as_dict()
+
+@app.get("/stations", response_model=StationPage)
+async def list_stations(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: Optional[Literal["json", "ndjson"]] = STREAM_QUERY,
+):
+    try:
+        if stream:
+            rows = keyset_find(station_collection, {}, "name", False, cursor, list_projection(StationInDB))
+            return stream_list(StationInDB, rows, stream)
+        rows, next_cursor = await fetch_page(
+            station_collection, {}, "name", False, cursor, limit, list_projection(StationInDB)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return render_page(StationPage, StationInDB, rows, next_cursor=next_cursor)
+
+@app.get("/stations/changes", response_model=StationChanges)
+async def station_changes(changed_since: Optional[str] = CHANGED_SINCE_QUERY, limit: int = SYNC_LIMIT_QUERY):
+    return await sync_page(StationChanges, StationInDB, station_collection, "stations", changed_since, limit)
+
+@app.get("/stations/near", response_model=List[StationWithDistance])
+async def stations_near(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    max_distance: Optional[float] = Query(None, gt=0, description="Radio en metros"),
+):
+    """Las `limit` estaciones más cercanas al punto, opcionalmente dentro de un radio."""
+    geo_near = {"near": point(lon, lat), "distanceField": "distance", "spherical": True}
+    if max_distance is not None:
+        geo_near["maxDistance"] = max_distance
+    pipeline = [{"$geoNear": geo_near}, {"$limit": limit}, {"$project": {"location": 0}}]
+    stations = await station_collection.aggregate(pipeline).to_list(length=None)
+    return render_list(StationWithDistance, stations)
+
+@app.get("/stations/within", response_model=List[StationInDB])
+async def stations_within(
+    min_lon: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    limit: int = Query(500, ge=1, le=5000),
+):
+    """
+    Estaciones dentro del rectángulo visible del mapa. Se responde desde el
+    índice en memoria; si min_lon > max_lon el rectángulo cruza el antimeridiano.
+    """
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must be <= max_lat")
+    await station_geo_index.ensure_fresh(station_collection)
+    stations = station_geo_index.within(min_lon, min_lat, max_lon, max_lat, limit)
+    return render_list(StationInDB, stations)
 
 @app.get("/stations/{station_id}", response_model=StationInDB)
-async def get_station(station_id: str):
+async def get_station(station_id: str, response: Response):
     if not ObjectId.is_valid(station_id):
         raise HTTPException(status_code=400, detail="Invalid station ID")
     station = await station_collection.find_one({"_id": ObjectId(station_id)})
     if not station:
         raise HTTPException(status_code=404, detail="Station not found")
     station["_id"] = str(station["_id"])
+    response.headers["ETag"] = version_etag(station.get("version"))
     return StationInDB(**station)
 
 @app.put("/stations/{station_id}", response_model=StationInDB)
 async def update_station(
     station_id: str,
     station_update: StationUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     if not ObjectId.is_valid(station_id):
@@ -357,20 +938,197 @@ async def update_station(
     update_data = {k: v for k, v in station_update.dict(exclude_unset=True).items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
+    update_data["updated_at"] = datetime.utcnow()
 
-    result = await station_collection.update_one({"_id": ObjectId(station_id)}, {"$set": update_data})
-    if result.matched_count == 0:
+    update = {"$set": update_data, "$inc": {"version": 1}}
+    if "lon" in update_data or "lat" in update_data:
+        # Recalcular el punto GeoJSON a partir de los valores finales de lon/lat
+        # ($inc no existe en un pipeline: la versión se suma con $add)
+        update = [
+            {"$set": {k: {"$literal": v} for k, v in update_data.items()}},
+            {"$set": {
+                "location": {"type": "Point", "coordinates": ["$lon", "$lat"]},
+                "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            }},
+        ]
+    versions = parse_if_match(if_match)
+    updated = await station_collection.find_one_and_update(
+        match_filter(ObjectId(station_id), versions),
+        update,
+        projection={"location": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated is None:
+        await raise_if_conflict(station_collection, ObjectId(station_id), versions)
         raise HTTPException(status_code=404, detail="Station not found")
 
-    updated = await station_collection.find_one({"_id": ObjectId(station_id)})
     updated["_id"] = str(updated["_id"])
+    station_geo_index.upsert(updated)
+    await response_cache.invalidate("stations")
+    event_broker.notify("stations", "updated", [station_id], updated.get("version"))
+    response.headers["ETag"] = version_etag(updated.get("version"))
     return StationInDB(**updated)
 
 @app.delete("/stations/{station_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_station(station_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_station(
+    station_id: str,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     if not ObjectId.is_valid(station_id):
         raise HTTPException(status_code=400, detail="Invalid station ID")
-    await station_collection.delete_one({"_id": ObjectId(station_id)})
+    versions = parse_if_match(if_match)
+    station = await station_collection.find_one_and_delete(
+        match_filter(ObjectId(station_id), versions), projection={"_id": 1}
+    )
+    if station:
+        await delta_sync.record_deletion("stations", station_id)
+        station_geo_index.remove(station_id)
+        event_broker.notify("stations", "deleted", [station_id])
+    else:
+        await raise_if_conflict(station_collection, ObjectId(station_id), versions)
+    await response_cache.invalidate("stations")
+
+# === MEDICIONES DE ESTACIONES ===
+
+MAX_MEASUREMENT_BATCH = 10000
+
+@app.post(
+    "/stations/{station_id}/measurements",
+    response_model=MeasurementBatchResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def ingest_measurements(
+    station_id: str,
+    readings: List[MeasurementIn],
+    current_user: dict = Depends(get_current_user)
+):
+    """Ingesta por lotes de lecturas de una estación (un insert_many por petición)."""
+    if not ObjectId.is_valid(station_id):
+        raise HTTPException(status_code=400, detail="Invalid station ID")
+    if len(readings) > MAX_MEASUREMENT_BATCH:
+        raise HTTPException(status_code=413, detail=f"Too many readings (max {MAX_MEASUREMENT_BATCH})")
+    station = await station_collection.find_one({"_id": ObjectId(station_id)}, {"charts_permited": 1})
+    if not station:
+        raise HTTPException(status_code=404, detail="Station not found")
+
+    permitted = set(station.get("charts_permited", []))
+    invalid = sorted({r.variable for r in readings} - permitted)
+    if invalid:
+        raise HTTPException(status_code=422, detail=f"Variables not permitted for this station: {invalid}")
+
+    inserted = await measurement_store.ingest(station_id, [r.dict() for r in readings])
+    await response_cache.invalidate(measurements_namespace(station_id))
+    return MeasurementBatchResult(inserted=inserted)
+
+@app.get("/stations/{station_id}/measurements", response_model=MeasurementSeries)
+async def get_measurements(
+    station_id: str,
+    variable: str,
+    start: datetime,
+    end: datetime,
+    max_points: int = Query(500, ge=1, le=5000),
+    resolution: str = Query("auto", pattern="^(auto|raw|minute|hour|day)$"),
+):
+    """
+    Serie de una variable en [start, end). Con resolution=auto se elige el
+    agregado más fino que no supera max_points puntos.
+    """
+    if not ObjectId.is_valid(station_id):
+        raise HTTPException(status_code=400, detail="Invalid station ID")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    chosen = resolve_resolution(resolution, start, end, max_points)
+    points = await measurement_store.series(station_id, variable, start, end, chosen, max_points)
+    return MeasurementSeries(station_id=station_id, variable=variable, resolution=chosen, points=points)
+
+# === BÚSQUEDA ===
+
+@app.get("/search", response_model=SearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = Query(None, pattern="^(news|documents)$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+):
+    """Búsqueda de texto (sin acentos, ordenada por BM25) en noticias y documentos."""
+    kinds = [type] if type else ["news", "documents"]
+    hits, total = await search_index.search(q, kinds, limit, offset)
+    next_offset = offset + limit if offset + limit < total else None
+    return SearchPage(items=hits, total=total, next_offset=next_offset)
+
+# === EVENTOS ===
+# Avisos de altas, cambios y bajas para que los clientes no sondeen los
+# listados: el aviso lleva el id y la versión; el cliente relee lo que le
+# interese. "resync" indica que se perdieron avisos (cliente lento o
+# reinicio del change stream) y hay que releer los listados.
+
+EVENTS_RETRY_MS = 3000  # espera sugerida al navegador antes de reconectar
+TOPICS_QUERY = Query(None, description="Temas separados por comas: news,documents,stations (todos por defecto)")
+
+async def sse_events(topics: set):
+    # La suscripción se abre dentro del generador: se cierra siempre en su finally
+    subscription = event_broker.subscribe(topics)
+    if subscription is None:
+        return
+    try:
+        yield f"retry: {EVENTS_RETRY_MS}\n\n".encode("ascii")
+        while True:
+            try:
+                event = await subscription.next(EVENTS_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                # Latido: mantiene abiertos los proxies y detecta clientes desconectados
+                yield b": ping\n\n"
+                continue
+            if event is None:
+                return
+            yield event.sse()
+    finally:
+        event_broker.unsubscribe(subscription)
+
+@app.get("/events", include_in_schema=False)
+async def events(topics: Optional[str] = TOPICS_QUERY):
+    """Server-sent events: un evento "news.created", "stations.deleted"... por cambio."""
+    try:
+        requested = parse_topics(topics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if event_broker.full:
+        raise HTTPException(status_code=503, detail="Too many event subscribers")
+    return StreamingResponse(
+        sse_events(requested),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/events/ws")
+async def events_websocket(websocket: WebSocket, topics: Optional[str] = None):
+    """Los mismos eventos que /events, un JSON por mensaje de texto."""
+    try:
+        requested = parse_topics(topics)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    subscription = event_broker.subscribe(requested)
+    if subscription is None:
+        await websocket.close(code=1013)  # Try again later
+        return
+    try:
+        await websocket.accept()
+        while True:
+            try:
+                event = await subscription.next(EVENTS_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                await websocket.send_text('{"type":"ping"}')
+                continue
+            if event is None:
+                await websocket.close(code=1001)
+                return
+            await websocket.send_text(event.data.decode("utf-8"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_broker.unsubscribe(subscription)
 
 # === ENDPOINTS AUXILIARES ===
 
@@ -379,13 +1137,14 @@ async def init_admin():
     """Crea un usuario administrador para desarrollo."""
     if await user_collection.find_one({"username": "admin"}):
         return {"message": "Admin user already exists"}
-    hashed_pw = get_password_hash("admin123")
+    hashed_pw = await get_password_hash("admin123")
     await user_collection.insert_one({
         "username": "admin",
         "email": "admin@example.com",
         "hashed_password": hashed_pw,
         "is_admin": True
     })
+    invalidate_user("admin")
     return {"message": "Admin created (email: admin@example.com, password: admin123)"}
 
 @app.post("/verify", response_model=dict)
@@ -398,12 +1157,63 @@ async def verify_token(current_user: dict = Depends(get_current_user)):
         "message": "Token válido"
     }
 
-# === EJECUCIÓN ===
+@app.get("/internal/stats", include_in_schema=False)
+async def internal_stats(current_user: dict = Depends(get_current_user)):
+    """Estado de los pools de trabajo (profundidad de cola, tareas en curso)."""
+    return {
+        "media_io": media_io.media_pool.stats(),
+        "image": media_io.image_pool.stats(),
+        "password_hash": hash_pool.stats(),
+        "auth_cache": cache_stats(),
+        "response_cache": response_cache.stats(),
+        "profiler": slow_request_profiler.stats(),
+        "jobs": await job_queue.stats(),
+        "orphan_sweep": orphan_sweeper.last_run,
+        "events": event_broker.stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/internal/profiler", include_in_schema=False)
+async def toggle_profiler(
+    enabled: bool,
+    threshold_ms: Optional[float] = Query(None, gt=0),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Activa o desactiva el perfilador de peticiones lentas. Las pilas de las
+    peticiones que superan threshold_ms se escriben en PROFILE_DIR (.folded).
+    """
+    if enabled:
+        slow_request_profiler.stop()
+        slow_request_profiler.start(threshold_ms or slow_request_profiler.threshold_ms or 500)
+    else:
+        slow_request_profiler.stop()
+    return slow_request_profiler.stats()
 
-async def main():
-    config = Config(app=app, host="0.0.0.0", port=8000, reload=True)
-    server = Server(config)
-    await server.serve()
+# === SALUD ===
+
+@app.get("/health/live", include_in_schema=False)
+async def liveness():
+    """El proceso está vivo y su event loop responde."""
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    """Listo para recibir tráfico: arranque completo y Mongo accesible."""
+    if not app.state.ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if not await ping(db):
+        return JSONResponse({"status": "database unavailable"}, status_code=503)
+    return {"status": "ready"}
+
+# === EJECUCIÓN ===
+# Desarrollo (un proceso con recarga): python main.py
+# Producción (un worker por núcleo): python -m scripts.serve --mode prod
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    from scripts.serve import main
+    main()
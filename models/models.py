@@ -47,6 +47,10 @@ class DocumentUpdate(BaseModel):
 class DocumentInDB(DocumentBase):
     id: PyObjectId = Field(alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    version: int = 0  # Se envía como ETag; 0 en documentos anteriores al campo
 
     model_config = {
         "populate_by_name": True,
@@ -56,6 +60,12 @@ class DocumentInDB(DocumentBase):
 
 
 # Modelos para Noticias
+class ImageVariant(BaseModel):
+    width: int
+    format: str  # Extensión del archivo: jpg, png o webp
+    url: str
+
+
 class NewsBase(BaseModel):
     title: str
     category: str  # Categoría como string (no como ObjectId)
@@ -76,8 +86,12 @@ class NewsUpdate(BaseModel):
 
 class NewsInDB(NewsBase):
     id: PyObjectId = Field(alias="_id")
+    img_variants: List[ImageVariant] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    excerpt: str = ""  # Precalculados a partir de `content` (scripts/news_summary.py)
+    reading_time: int = 0
+    version: int = 0
 
     model_config = {
         "populate_by_name": True,
@@ -89,8 +103,8 @@ class NewsInDB(NewsBase):
 # Modelos para Estaciones
 class StationBase(BaseModel):
     name: str
-    lon: int = Field(..., ge=-180, le=180, description="Longitud entre -180 y 180")
-    lat: int = Field(..., ge=-90, le=90, description="Latitud entre -90 y 90")
+    lon: float = Field(..., ge=-180, le=180, description="Longitud entre -180 y 180")
+    lat: float = Field(..., ge=-90, le=90, description="Latitud entre -90 y 90")
     charts_permited: List[str]  # Lista de identificadores o nombres de gráficos permitidos
 
 
@@ -100,17 +114,135 @@ class StationCreate(StationBase):
 
 class StationUpdate(BaseModel):
     name: Optional[str] = None
-    lon: Optional[int] = None
-    lat: Optional[int] = None
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+    lat: Optional[float] = Field(None, ge=-90, le=90)
     charts_permited: Optional[List[str]] = None
 
 
 class StationInDB(StationBase):
     id: PyObjectId = Field(alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0
 
     model_config = {
         "populate_by_name": True,
         "arbitrary_types_allowed": True,
         "json_encoders": {ObjectId: str},
-    }
\ No newline at end of file
+    }
+
+class StationWithDistance(StationInDB):
+    distance: float = Field(..., description="Distancia en metros al punto consultado")
+
+
+# Modelos de paginación (keyset / cursor)
+class NewsSummary(BaseModel):
+    """Vista de listado (view=summary): sin `content`, con extracto y tiempo de lectura."""
+    id: PyObjectId = Field(alias="_id")
+    title: str
+    category: str
+    img_url: Optional[str] = None
+    img_variants: List[ImageVariant] = []
+    excerpt: str = ""
+    reading_time: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0
+
+    model_config = {
+        "populate_by_name": True,
+        "arbitrary_types_allowed": True,
+        "json_encoders": {ObjectId: str},
+    }
+
+
+class NewsPage(BaseModel):
+    items: List[NewsInDB]
+    next_cursor: Optional[str] = None
+
+
+class NewsSummaryPage(BaseModel):
+    items: List[NewsSummary]
+    next_cursor: Optional[str] = None
+
+
+class DocumentPage(BaseModel):
+    items: List[DocumentInDB]
+    next_cursor: Optional[str] = None
+
+
+class StationPage(BaseModel):
+    items: List[StationInDB]
+    next_cursor: Optional[str] = None
+
+
+# Modelos de sincronización incremental (changed_since)
+class NewsChanges(BaseModel):
+    items: List[NewsInDB]  # Creadas o modificadas desde el token
+    deleted: List[str]  # Ids borrados desde el token
+    sync_token: str
+    has_more: bool
+
+
+class DocumentChanges(BaseModel):
+    items: List[DocumentInDB]
+    deleted: List[str]
+    sync_token: str
+    has_more: bool
+
+
+class StationChanges(BaseModel):
+    items: List[StationInDB]
+    deleted: List[str]
+    sync_token: str
+    has_more: bool
+
+
+# Modelos de búsqueda
+class SearchHit(BaseModel):
+    type: str  # "news" o "documents"
+    id: str
+    score: float
+    title: Optional[str] = None
+
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    total: int
+    next_offset: Optional[int] = None
+
+
+# Modelos de mediciones de estaciones (series temporales)
+class MeasurementIn(BaseModel):
+    variable: str  # Debe estar en charts_permited de la estación
+    ts: datetime
+    value: float
+
+
+class MeasurementBatchResult(BaseModel):
+    inserted: int
+
+
+class MeasurementPoint(BaseModel):
+    ts: datetime
+    min: float
+    max: float
+    avg: float
+
+
+class MeasurementSeries(BaseModel):
+    station_id: str
+    variable: str
+    resolution: str
+    points: List[MeasurementPoint]
+
+
+# Modelos de importación masiva (NDJSON)
+class ImportLineError(BaseModel):
+    line: int  # Número de línea (desde 1) en el cuerpo NDJSON
+    error: str
+
+
+class ImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[ImportLineError]  # Limitado a los primeros errores
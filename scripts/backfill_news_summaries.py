@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from dbconection import client, news_collection
+from scripts.news_summary import summarize
+
+BATCH_SIZE = 500
+
+
+async def backfill():
+    """
+    Calcula el extracto y el tiempo de lectura de las noticias creadas antes
+    de la vista de resumen. Cambia la representación: nueva versión (ETag) y
+    updated_at para la sincronización incremental.
+    Uso: python -m scripts.backfill_news_summaries
+    """
+    updated = 0
+    batch = []
+    cursor = news_collection.find({"excerpt": {"$exists": False}}, {"content": 1})
+    async for news in cursor:
+        batch.append(UpdateOne(
+            # Sin extracto todavía: dos ejecuciones no incrementan dos veces la versión
+            {"_id": news["_id"], "excerpt": {"$exists": False}},
+            {
+                "$set": {**summarize(news.get("content", "")), "updated_at": datetime.utcnow()},
+                "$inc": {"version": 1},
+            },
+        ))
+        if len(batch) >= BATCH_SIZE:
+            await news_collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await news_collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    print(f"Noticias actualizadas: {updated}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -0,0 +1,67 @@
+"""
+Benchmark: throughput de /login y latencia del resto de la API bajo carga de login.
+
+Requiere el servidor en marcha y un usuario válido:
+    python -m scripts.bench_login --url http://localhost:8000 \\
+        --email admin@example.com --password admin123
+Mide logins/s y los percentiles de GET /news con y sin ráfagas de login.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from scripts.bench_media_io import percentile, reader
+
+
+async def login_loop(client, email, password, latencies, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        r = await client.post("/login", data={"username": email, "password": password})
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_phase(client, args, logins):
+    read_latencies, login_latencies = [], []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(reader(client, read_latencies, stop)) for _ in range(args.readers)]
+    tasks += [
+        asyncio.create_task(login_loop(client, args.email, args.password, login_latencies, stop))
+        for _ in range(logins)
+    ]
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return read_latencies, login_latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        for label, logins in (("sin logins", 0), (f"{args.logins} logins", args.logins)):
+            reads, auths = await run_phase(client, args, logins)
+            line = (
+                f"{label:>12}: GET /news p50={percentile(reads, 50):.1f}ms "
+                f"p99={percentile(reads, 99):.1f}ms media={statistics.fmean(reads):.1f}ms"
+            )
+            if auths:
+                line += (
+                    f" | /login {len(auths) / args.seconds:.1f}/s "
+                    f"p99={percentile(auths, 99):.1f}ms"
+                )
+            print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark: latencia de GET /news mientras hay subidas de imágenes en curso.
+
+Requiere el servidor en marcha y un usuario válido:
+    python -m scripts.bench_media_io --url http://localhost:8000 \\
+        --email admin@example.com --password admin123
+Compara los percentiles de GET /news sin subidas y con N subidas concurrentes.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def login(client, email, password) -> dict:
+    r = await client.post("/login", data={"username": email, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def reader(client, latencies, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        r = await client.get("/news", params={"limit": 20})
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def uploader(client, headers, image_uri, created, stop):
+    while not stop.is_set():
+        r = await client.post(
+            "/news",
+            headers=headers,
+            json={"title": "bench", "category": "bench", "content": "bench", "img_url": image_uri},
+        )
+        r.raise_for_status()
+        created.append(r.json()["_id"])
+
+
+async def run_phase(client, headers, image_uri, readers, uploaders, seconds):
+    latencies, created = [], []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(reader(client, latencies, stop)) for _ in range(readers)]
+    tasks += [
+        asyncio.create_task(uploader(client, headers, image_uri, created, stop))
+        for _ in range(uploaders)
+    ]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    for news_id in created:
+        await client.delete(f"/news/{news_id}", headers=headers)
+    return latencies, len(created)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--uploaders", type=int, default=4)
+    parser.add_argument("--image-width", type=int, default=2400, help="Ancho de la imagen JPEG de prueba")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    # Imagen real: las subidas se validan y recodifican (bytes aleatorios se rechazan)
+    from scripts.bench_suite import make_image_uri
+    image_uri = make_image_uri(args.image_width, args.image_width * 5 // 8)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        headers = await login(client, args.email, args.password)
+        for label, uploaders in (("sin subidas", 0), (f"{args.uploaders} subidas", args.uploaders)):
+            latencies, uploads = await run_phase(
+                client, headers, image_uri, args.readers, uploaders, args.seconds
+            )
+            print(
+                f"{label:>14}: {len(latencies)} GET /news, {uploads} subidas | "
+                f"p50={percentile(latencies, 50):.1f}ms "
+                f"p99={percentile(latencies, 99):.1f}ms "
+                f"media={statistics.fmean(latencies):.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
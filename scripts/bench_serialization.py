@@ -0,0 +1,96 @@
+"""
+Benchmark: coste de serializar listados grandes en cada FAST_JSON_MODE.
+
+No necesita el servidor ni Mongo; monta una app FastAPI con los mismos
+modelos de respuesta y filas en memoria con la forma de los documentos:
+    python -m scripts.bench_serialization --sizes 1000 10000 --repeat 10
+Compara "model" (antes), "validated" y "trusted", y verifica que los tres
+modos producen el mismo JSON.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from models.models import NewsInDB, NewsPage, StationInDB
+from scripts import fast_json
+from scripts.fast_json import FAST_JSON_MODES, render_list, render_page
+
+
+def news_rows(n):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(), "title": f"Noticia {i}", "category": "medio ambiente",
+            "content": "Texto de la noticia " * 40, "img_url": f"/uploads/news/{i:064x}.jpg",
+            "img_variants": [
+                {"width": w, "format": f, "url": f"/uploads/news/{i:064x}_w{w}.{f}"}
+                for w in (320, 640) for f in ("jpg", "webp")
+            ],
+            "created_at": start + timedelta(minutes=i), "updated_at": start + timedelta(minutes=i),
+        }
+        for i in range(n)
+    ]
+
+
+def station_rows(n):
+    return [
+        {
+            "_id": str(ObjectId()), "name": f"Estación {i}", "lon": -74.0 + i * 1e-4, "lat": 4.6,
+            "charts_permited": ["temp", "hum", "rain"], "created_at": datetime(2024, 1, 1),
+        }
+        for i in range(n)
+    ]
+
+
+def build_app(rows):
+    app = FastAPI()
+
+    @app.get("/news", response_model=NewsPage)
+    async def news():
+        return render_page(NewsPage, NewsInDB, rows["news"], next_cursor=None)
+
+    @app.get("/stations", response_model=list[StationInDB])
+    async def stations():
+        return render_list(StationInDB, rows["stations"])
+
+    return app
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rows = {"news": news_rows(size), "stations": station_rows(size)}
+        app = build_app(rows)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for path in ("/news", "/stations"):
+                bodies = {}
+                for mode in FAST_JSON_MODES:
+                    fast_json.FAST_JSON_MODE = mode
+                    timings = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        r = await client.get(path)
+                        r.raise_for_status()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    bodies[mode] = json.loads(r.content)
+                    print(
+                        f"{size:>6} {path:<9} {mode:>9}: p50={statistics.median(timings):8.1f}ms "
+                        f"min={min(timings):8.1f}ms {len(r.content) / 1024:8.0f} KB"
+                    )
+                if any(body != bodies["model"] for body in bodies.values()):
+                    print(f"{'':>6} {path:<9} ATENCIÓN: los modos producen JSON distinto")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
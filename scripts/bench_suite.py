@@ -0,0 +1,484 @@
+"""
+Benchmark de la API completa con carga controlada y resultados en JSON.
+
+Por defecto arranca main.app en el mismo proceso contra mongomock-motor (un
+Mongo en memoria) en un directorio temporal, siembra datos y recorre todos
+los escenarios; con --url ataca un servidor ya en marcha:
+    python -m scripts.bench_suite --out bench/base.json
+    python -m scripts.bench_suite --compare bench/base.json --out bench/new.json
+    python -m scripts.bench_suite --url http://localhost:8000 --scenarios list_news login
+Contra mongomock las cifras miden el coste de la aplicación, no el de Mongo:
+compara siempre ejecuciones hechas con el mismo backend.
+"""
+import argparse
+import asyncio
+import base64
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import httpx
+
+from scripts.bench_media_io import percentile
+
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "admin123"
+WORDS = (
+    "bosque agua conservación especies páramo río comunidad monitoreo clima lluvia "
+    "temperatura restauración semillas suelo humedal aves estación reserva sendero"
+).split()
+
+
+# === DATOS DE PRUEBA ===
+
+def make_image_uri(width: int = 1600, height: int = 1000, seed: int = 0) -> str:
+    """Imagen JPEG real (con ruido, para que no comprima trivialmente) como data URI."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    image = Image.blend(image, Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3))), 0.5)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=90)
+    return "data:image/jpeg;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def make_document_uri(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(WORDS) for _ in range(size // 8)).encode()[:size]
+    return "data:application/pdf;base64," + base64.b64encode(b"%PDF-1.4\n" + text).decode("ascii")
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_lines(kind: str, count: int, rng: random.Random):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        if kind == "news":
+            item = {
+                "title": sentence(rng, 6).capitalize(),
+                "category": rng.choice(("medio ambiente", "comunidad", "investigación", "eventos")),
+                "content": sentence(rng, 250),
+            }
+        elif kind == "documents":
+            item = {
+                "name": f"Informe {i:05d} {sentence(rng, 3)}",
+                "document_url": make_document_uri(2048, seed=i),
+                "description": sentence(rng, 30),
+                "autor": sentence(rng, 2).title(),
+                "date_disponibility": (start + timedelta(days=i)).isoformat(),
+            }
+        else:
+            item = {
+                "name": f"Estación {i:05d}",
+                "lon": round(rng.uniform(-79, -67), 5),
+                "lat": round(rng.uniform(-4, 12), 5),
+                "charts_permited": ["temperatura", "humedad", "lluvia"],
+            }
+        yield json.dumps(item, ensure_ascii=False)
+
+
+# === APLICACIÓN EN PROCESO ===
+
+def _patch_mongomock():
+    """Huecos de mongomock frente a pymongo 4.x que la aplicación usa al arrancar."""
+    import mongomock.collection
+    import mongomock.database
+
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+    def _add_update(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    create_collection = mongomock.database.Database.create_collection
+
+    def _create_collection(self, name, **kwargs):
+        kwargs.pop("timeseries", None)  # Se crea como colección normal
+        return create_collection(self, name, **kwargs)
+
+    mongomock.collection.BulkOperationBuilder.add_update = _add_update
+    mongomock.database.Database.create_collection = _create_collection
+
+
+def _rebind_collections(obj, db, seen):
+    """Sustituye colecciones y bases de datos de Motor por las de mongomock."""
+    from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    for name, value in list(vars(obj).items()):
+        if isinstance(value, AsyncIOMotorCollection):
+            setattr(obj, name, db[value.name])
+        elif isinstance(value, AsyncIOMotorDatabase):
+            setattr(obj, name, db)
+        elif (
+            not isinstance(value, type)
+            and hasattr(value, "__dict__")
+            and type(value).__module__.startswith(("scripts", "main", "dbconection"))
+        ):
+            _rebind_collections(value, db, seen)
+
+
+@asynccontextmanager
+async def in_process_app():
+    """main.app sobre mongomock, en un directorio temporal para las subidas."""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("Se necesita mongomock-motor (pip install mongomock-motor) o usar --url")
+
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    os.chdir(workdir)  # main crea y sirve uploads/ relativo al cwd
+    _patch_mongomock()
+    main = importlib.import_module("main")
+    client = AsyncMongoMockClient()
+    db = client["bqverde"]
+    main.client, main.db = client, db
+    seen = set()
+    for module in list(sys.modules.values()):
+        if getattr(module, "__name__", "").startswith(("scripts.", "main", "dbconection")):
+            _rebind_collections(module, db, seen)
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+            yield http, workdir
+
+
+@asynccontextmanager
+async def remote_app(url):
+    async with httpx.AsyncClient(base_url=url, timeout=120) as http:
+        yield http, None
+
+
+# === ESCENARIOS ===
+
+class Context:
+    """Estado compartido por los escenarios (credenciales e ids sembrados)."""
+
+    def __init__(self, http, rng):
+        self.http = http
+        self.rng = rng
+        self.headers = {}
+        self.news_ids, self.document_ids, self.station_ids = [], [], []
+        self.cursor = None
+        self.sync_token = None
+        self.static_url = None
+        self.image_uri = None
+        self.document_uri = make_document_uri(256 * 1024, seed=42)
+
+
+async def prepare(ctx: Context, args):
+    http = ctx.http
+    await http.post("/init-admin")
+    r = await http.post("/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    r.raise_for_status()
+    ctx.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    seed_rng = random.Random(args.seed)
+    for kind, count in (("news", args.news), ("documents", args.documents), ("stations", args.stations)):
+        if count <= 0:
+            continue
+        start = time.perf_counter()
+        body = "\n".join(seed_lines(kind, count, seed_rng)).encode()
+        r = await http.post(
+            f"/{kind}/import", content=body,
+            headers={**ctx.headers, "content-type": "application/x-ndjson"},
+        )
+        r.raise_for_status()
+        report = r.json()
+        failed = f" ({report['failed']} fallidos)" if report["failed"] else ""
+        print(f"sembrado {kind}: {report['inserted']} en {time.perf_counter() - start:.1f}s{failed}")
+
+    for path, ids in (("/news", ctx.news_ids), ("/documents", ctx.document_ids), ("/stations", ctx.station_ids)):
+        r = await http.get(path, params={"limit": 100})
+        r.raise_for_status()
+        page = r.json()
+        ids += [item["_id"] for item in page["items"]]
+        if path == "/news":
+            ctx.cursor = page["next_cursor"]
+
+    ctx.image_uri = make_image_uri(seed=args.seed)
+    r = await http.post(
+        "/news", headers=ctx.headers,
+        json={"title": "Imagen de referencia", "category": "bench", "content": "bench", "img_url": ctx.image_uri},
+    )
+    r.raise_for_status()
+    ctx.static_url = r.json()["img_url"]
+
+
+def pick(ctx, ids):
+    return ctx.rng.choice(ids) if ids else "000000000000000000000000"
+
+
+async def s_list_news(ctx):
+    return await ctx.http.get("/news", params={"limit": 20})
+
+
+async def s_list_news_page2(ctx):
+    return await ctx.http.get("/news", params={"limit": 20, "cursor": ctx.cursor} if ctx.cursor else {"limit": 20})
+
+
+async def s_list_news_large(ctx):
+    return await ctx.http.get("/news", params={"limit": 100})
+
+
+async def s_list_news_summary(ctx):
+    return await ctx.http.get("/news", params={"limit": 100, "view": "summary"})
+
+
+async def s_export_news(ctx):
+    # Listado completo en streaming (httpx negocia br/gzip por defecto)
+    return await ctx.http.get("/news", params={"stream": "ndjson"})
+
+
+async def s_sync_news(ctx):
+    # Cliente que se mantiene al día: primero todo (por páginas), luego solo los cambios
+    params = {"changed_since": ctx.sync_token} if ctx.sync_token else {}
+    r = await ctx.http.get("/news/changes", params=params)
+    if r.status_code == 200:
+        ctx.sync_token = r.json()["sync_token"]
+    return r
+
+
+async def s_get_news(ctx):
+    return await ctx.http.get(f"/news/{pick(ctx, ctx.news_ids)}")
+
+
+async def s_list_documents(ctx):
+    return await ctx.http.get("/documents", params={"limit": 20})
+
+
+async def s_get_document(ctx):
+    return await ctx.http.get(f"/documents/{pick(ctx, ctx.document_ids)}")
+
+
+async def s_list_stations(ctx):
+    return await ctx.http.get("/stations", params={"limit": 100})
+
+
+async def s_stations_within(ctx):
+    lon, lat = ctx.rng.uniform(-79, -70), ctx.rng.uniform(-4, 8)
+    return await ctx.http.get(
+        "/stations/within", params={"min_lon": lon, "min_lat": lat, "max_lon": lon + 3, "max_lat": lat + 3}
+    )
+
+
+async def s_stations_near(ctx):
+    return await ctx.http.get("/stations/near", params={"lon": -74.08, "lat": 4.6, "limit": 10})
+
+
+async def s_search(ctx):
+    return await ctx.http.get("/search", params={"q": " ".join(ctx.rng.sample(WORDS, 2))})
+
+
+async def s_static_image(ctx):
+    return await ctx.http.get(ctx.static_url)
+
+
+async def s_login(ctx):
+    return await ctx.http.post("/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+
+
+async def s_verify(ctx):
+    return await ctx.http.post("/verify", headers=ctx.headers)
+
+
+async def s_create_news(ctx):
+    return await ctx.http.post(
+        "/news", headers=ctx.headers,
+        json={"title": sentence(ctx.rng, 5), "category": "bench", "content": sentence(ctx.rng, 100)},
+    )
+
+
+async def s_upload_image(ctx):
+    # Misma imagen: mide decodificación y deduplicación por hash (variantes en segundo plano)
+    return await ctx.http.post(
+        "/news", headers=ctx.headers,
+        json={"title": "bench", "category": "bench", "content": "bench", "img_url": ctx.image_uri},
+    )
+
+
+async def s_upload_document(ctx):
+    return await ctx.http.post(
+        "/documents", headers=ctx.headers,
+        json={
+            "name": f"bench {ctx.rng.random()}", "document_url": ctx.document_uri,
+            "description": "bench", "autor": "bench", "date_disponibility": "2024-01-01T00:00:00",
+        },
+    )
+
+
+async def s_measurements(ctx):
+    start = datetime(2024, 1, 1) + timedelta(minutes=ctx.rng.randrange(500_000))
+    readings = [
+        {"variable": "temperatura", "ts": (start + timedelta(minutes=i)).isoformat(), "value": 15 + ctx.rng.random() * 10}
+        for i in range(100)
+    ]
+    return await ctx.http.post(f"/stations/{pick(ctx, ctx.station_ids)}/measurements", headers=ctx.headers, json=readings)
+
+
+SCENARIOS = {
+    "list_news": s_list_news,
+    "list_news_page2": s_list_news_page2,
+    "list_news_100": s_list_news_large,
+    "list_news_100_summary": s_list_news_summary,
+    "export_news_ndjson": s_export_news,
+    "sync_news_delta": s_sync_news,
+    "get_news": s_get_news,
+    "list_documents": s_list_documents,
+    "get_document": s_get_document,
+    "list_stations_100": s_list_stations,
+    "stations_within": s_stations_within,
+    "stations_near": s_stations_near,
+    "search": s_search,
+    "static_image": s_static_image,
+    "login": s_login,
+    "verify": s_verify,
+    "create_news": s_create_news,
+    "upload_image": s_upload_image,
+    "upload_document": s_upload_document,
+    "measurements_100": s_measurements,
+}
+# $geoNear no existe en mongomock
+REMOTE_ONLY = {"stations_near"}
+
+
+async def run_scenario(ctx, scenario, concurrency, seconds, max_requests):
+    latencies, errors = [], 0
+    statuses = {}
+    deadline = time.perf_counter() + seconds
+    issued = 0
+
+    async def worker():
+        nonlocal errors, issued
+        while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+            issued += 1
+            start = time.perf_counter()
+            try:
+                r = await scenario(ctx)
+                status = r.status_code
+            except Exception:
+                status = "exception"
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "exception" or status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p90_ms": round(percentile(latencies, 90), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "max_ms": round(max(latencies), 3) if latencies else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_comparison(results, baseline):
+    print(f"\n{'escenario':<20} {'rps':>10} {'Δrps':>8} {'p50 ms':>9} {'Δp50':>8} {'p99 ms':>9} {'Δp99':>8}")
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+
+        def delta(key):
+            if not previous or not previous.get(key):
+                return "-"
+            return f"{(current[key] - previous[key]) / previous[key] * 100:+.0f}%"
+
+        print(f"{name:<20} {current['rps']:>10.1f} {delta('rps'):>8} {current['p50_ms']:>9.2f} "
+              f"{delta('p50_ms'):>8} {current['p99_ms']:>9.2f} {delta('p99_ms'):>8}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Servidor en marcha (por defecto: main.app en proceso sobre mongomock)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), help="Por defecto, todos")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duración de cada escenario")
+    parser.add_argument("--max-requests", type=int, default=0, help="Tope de peticiones por escenario (0 = sin tope)")
+    parser.add_argument("--news", type=int, default=2000)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--stations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    out = os.path.abspath(args.out) if args.out else None
+
+    names = args.scenarios or list(SCENARIOS)
+    if not args.url:
+        names = [n for n in names if n not in REMOTE_ONLY]
+
+    app_context = remote_app(args.url) if args.url else in_process_app()
+    results = {}
+    async with app_context as (http, workdir):
+        ctx = Context(http, random.Random(args.seed))
+        await prepare(ctx, args)
+        for name in names:
+            result = await run_scenario(ctx, SCENARIOS[name], args.concurrency, args.seconds, args.max_requests)
+            results[name] = result
+            errors = f" errores={result['errors']}" if result["errors"] else ""
+            print(
+                f"{name:<20} {result['requests']:>7} req {result['rps']:>9.1f}/s "
+                f"p50={result['p50_ms']:.2f}ms p90={result['p90_ms']:.2f}ms p99={result['p99_ms']:.2f}ms{errors}"
+            )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git": git_revision(),
+            "backend": args.url or "mongomock",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "seed": args.seed,
+            "volumes": {"news": args.news, "documents": args.documents, "stations": args.stations},
+        },
+        "results": results,
+    }
+    if baseline:
+        print_comparison(results, baseline)
+    if out:
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Benchmark: coste por petición del limitador de subidas en el camino GET.
+
+No necesita el servidor ni Mongo; llama directamente a la aplicación ASGI:
+    python -m scripts.bench_upload_limit --requests 20000
+Compara una ruta GET sin middleware, con el antiguo BaseHTTPMiddleware y con
+UploadLimitMiddleware, y comprueba que un cuerpo chunked demasiado grande se
+corta en cuanto supera el límite.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from scripts.bench_media_io import percentile
+from scripts.upload_limit import UploadLimitMiddleware, MB
+
+
+class LegacyLimitMiddleware(BaseHTTPMiddleware):
+    """El limitador anterior: solo mira Content-Length."""
+
+    def __init__(self, app, max_upload_size: int = 50 * MB):
+        super().__init__(app)
+        self.max_upload_size = max_upload_size
+
+    async def dispatch(self, request, call_next):
+        content_length = request.headers.get("content-length")
+        if content_length and int(content_length) > self.max_upload_size:
+            return JSONResponse(status_code=413, content={"detail": "File too large (max 50 MB)"})
+        return await call_next(request)
+
+
+async def ping(request):
+    return PlainTextResponse("ok")
+
+
+async def upload(request: Request):
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    return JSONResponse({"size": size})
+
+
+def build_app(middleware=None, **options):
+    app = Starlette(routes=[Route("/ping", ping), Route("/upload", upload, methods=["POST"])])
+    if middleware is not None:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+async def call(app, method, path, chunks=(), headers=()):
+    """Ejecuta una petición ASGI; devuelve (status, bytes de cuerpo consumidos por la app)."""
+    pending = list(chunks)
+    consumed = 0
+    status = None
+
+    async def receive():
+        nonlocal consumed
+        if not pending:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        body = pending.pop(0)
+        consumed += len(body)
+        return {"type": "http.request", "body": body, "more_body": bool(pending)}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": list(headers), "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    return status, consumed
+
+
+async def measure_get(app, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await call(app, "GET", "/ping")
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--limit-mb", type=int, default=5)
+    args = parser.parse_args()
+
+    stacks = {
+        "sin middleware": build_app(),
+        "BaseHTTPMiddleware": build_app(LegacyLimitMiddleware, max_upload_size=args.limit_mb * MB),
+        "ASGI puro": build_app(UploadLimitMiddleware, default_limit=args.limit_mb * MB),
+    }
+    for label, app in stacks.items():
+        await measure_get(app, 500)  # Calentamiento
+        latencies = await measure_get(app, args.requests)
+        print(
+            f"{label:>20}: GET p50={percentile(latencies, 50):.1f}µs "
+            f"p99={percentile(latencies, 99):.1f}µs media={statistics.fmean(latencies):.1f}µs"
+        )
+
+    # Cuerpo chunked de 4x el límite, en trozos de 64 KB y sin Content-Length
+    chunk = b"x" * (64 * 1024)
+    chunks = [chunk] * (args.limit_mb * 4 * 16)
+    for label in ("BaseHTTPMiddleware", "ASGI puro"):
+        status, consumed = await call(stacks[label], "POST", "/upload", chunks)
+        print(f"{label:>20}: POST chunked {len(chunks) * len(chunk) / MB:.0f} MB -> {status}, "
+              f"{consumed / MB:.1f} MB leídos")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
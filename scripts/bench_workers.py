@@ -0,0 +1,133 @@
+"""
+Benchmark: escalado del throughput con el número de workers en producción.
+
+Lanza `scripts.serve --mode prod` con cada número de workers (necesita Mongo
+accesible con la configuración MONGO_* habitual), espera a /health/ready y
+lo carga con varios procesos cliente; después envía SIGTERM y mide el cierre:
+    python -m scripts.bench_workers --workers 1 2 4 8 --path "/news?limit=20"
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from scripts.bench_media_io import percentile
+
+
+async def _connection(host, port, path, deadline, latencies):
+    """Cliente HTTP/1.1 mínimo con keep-alive: el cliente no debe ser el cuello de botella."""
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: identity\r\n\r\n".encode()
+    errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            if length:
+                await reader.readexactly(length)
+            if b" 200 " not in status_line:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        writer.close()
+    return errors
+
+
+def _client_process(host, port, path, seconds, connections, queue):
+    async def run():
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        errors = await asyncio.gather(*(
+            _connection(host, port, path, deadline, latencies) for _ in range(connections)
+        ))
+        return latencies, sum(errors)
+
+    queue.put(asyncio.run(run()))
+
+
+def wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--path", default="/news?limit=20")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Procesos cliente generando carga")
+    parser.add_argument("--connections", type=int, default=32, help="Conexiones por proceso cliente")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    host = "127.0.0.1"
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        server = subprocess.Popen([
+            sys.executable, "-m", "scripts.serve", "--mode", "prod", "--app", args.app,
+            "--host", host, "--port", str(args.port), "--workers", str(workers),
+        ])
+        try:
+            if not wait_ready(f"http://{host}:{args.port}/health/ready", args.ready_timeout):
+                print(f"{workers} workers: el servidor no llegó a estar listo")
+                continue
+            queue = multiprocessing.Queue()
+            clients = [
+                multiprocessing.Process(
+                    target=_client_process,
+                    args=(host, args.port, args.path, args.seconds, args.connections, queue),
+                )
+                for _ in range(args.clients)
+            ]
+            for c in clients:
+                c.start()
+            latencies, errors = [], 0
+            for _ in clients:
+                part, part_errors = queue.get()
+                latencies += part
+                errors += part_errors
+            for c in clients:
+                c.join()
+        finally:
+            start = time.perf_counter()
+            server.send_signal(signal.SIGTERM)
+            code = server.wait()
+            shutdown = time.perf_counter() - start
+
+        rps = len(latencies) / args.seconds
+        baseline = baseline or (workers, rps)
+        scaling = rps / baseline[1] if baseline[1] else 0.0
+        print(
+            f"{workers:>3} workers: {rps:>9.1f} req/s (x{scaling:.2f} vs {baseline[0]}) "
+            f"p50={percentile(latencies, 50):.1f}ms p99={percentile(latencies, 99):.1f}ms "
+            f"errores={errors} | SIGTERM -> salida {code} en {shutdown:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
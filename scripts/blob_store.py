@@ -0,0 +1,67 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+
+class BlobStore:
+    """
+    Contador de referencias de archivos almacenados por contenido (SHA-256).
+    Cada documento de la colección `blobs` tiene como _id el hash del archivo;
+    `refs` cuenta cuántos registros lo usan. El archivo solo se elimina del
+    disco cuando se libera la última referencia.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def acquire(self, sha256: str, url: str, size: int) -> bool:
+        """Registra una referencia más. Devuelve True si es la primera."""
+        blob = await self.collection.find_one_and_update(
+            {"_id": sha256},
+            {
+                "$inc": {"refs": 1},
+                "$setOnInsert": {"url": url, "size": size, "created_at": datetime.utcnow()},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return blob["refs"] == 1
+
+    async def acquire_many(self, blobs: List[dict]) -> None:
+        """Registra en un único bulk_write una referencia por cada {"sha256", "url", "size"}."""
+        if not blobs:
+            return
+        refs = Counter(b["sha256"] for b in blobs)
+        first = {b["sha256"]: b for b in reversed(blobs)}
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"_id": sha256},
+                {
+                    "$inc": {"refs": count},
+                    "$setOnInsert": {"url": first[sha256]["url"], "size": first[sha256]["size"], "created_at": now},
+                },
+                upsert=True,
+            )
+            for sha256, count in refs.items()
+        ], ordered=False)
+
+    async def release(self, sha256: str) -> Optional[str]:
+        """
+        Libera una referencia. Si era la última, borra el registro y devuelve
+        la URL del archivo para que quien llama lo elimine del disco.
+        """
+        blob = await self.collection.find_one_and_update(
+            {"_id": sha256, "refs": {"$gt": 0}},
+            {"$inc": {"refs": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if blob is None or blob["refs"] > 0:
+            return None
+        deleted = await self.collection.find_one_and_delete({"_id": sha256, "refs": {"$lte": 0}})
+        return deleted["url"] if deleted else None
+
+    async def is_referenced(self, sha256: str) -> bool:
+        return await self.collection.count_documents({"_id": sha256, "refs": {"$gt": 0}}, limit=1) > 0
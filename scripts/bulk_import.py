@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+# Líneas validadas e insertadas por lote (y bytes como máximo: las líneas
+# con archivos en base64 pesan megas) y tareas de medios (imágenes,
+# documentos) en paralelo por importación.
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+BULK_IMPORT_BATCH_BYTES = int(os.getenv("BULK_IMPORT_BATCH_MB", "32")) * 1024 * 1024
+BULK_IMPORT_CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", "8"))
+# Línea más larga aceptada si la ruta no indica otra
+MAX_LINE_BYTES = 8 * 1024 * 1024
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    """Resultado de una importación: insertados, fallidos y errores por línea."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc']) or 'line'}: {e['msg']}" for e in error.errors()
+    )
+
+
+async def read_ndjson_lines(stream: AsyncIterator[bytes],
+                            max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, bytes]]:
+    """Líneas no vacías (número de línea, bytes) de un cuerpo NDJSON recibido por trozos."""
+    buffer = bytearray()
+    line_no = 0
+    async for chunk in stream:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            line = bytes(buffer[start:end]).strip()
+            if line:
+                yield line_no, line
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"Line {line_no + 1} too long (max {max_line_bytes} bytes)")
+    line = bytes(buffer).strip()
+    if line:
+        yield line_no + 1, line
+
+
+async def insert_many_unordered(collection, docs: List[dict]) -> Dict[int, str]:
+    """
+    insert_many sin orden: un fallo no detiene el resto. Devuelve los errores
+    por índice del lote ({índice: mensaje}); los _id quedan asignados en docs.
+    """
+    if not docs:
+        return {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {err["index"]: err.get("errmsg", "Write error") for err in e.details.get("writeErrors", [])}
+    return {}
+
+
+async def import_ndjson(
+    stream: AsyncIterator[bytes],
+    model: Type[BaseModel],
+    prepare: Callable[[dict], Awaitable[dict]],
+    commit: Callable[[List[dict]], Awaitable[Dict[int, str]]],
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    batch_bytes: int = BULK_IMPORT_BATCH_BYTES,
+    max_line_bytes: int = MAX_LINE_BYTES,
+    concurrency: int = BULK_IMPORT_CONCURRENCY,
+) -> ImportReport:
+    """
+    Importa un cuerpo NDJSON por lotes de `batch_size` líneas o `batch_bytes`
+    bytes. Cada línea se valida con `model`; `prepare` convierte el registro
+    validado en el documento a insertar (p. ej. guardando su imagen) y se
+    ejecuta con a lo sumo `concurrency` tareas a la vez; `commit` inserta el
+    lote y devuelve los fallos por índice. La memoria por importación queda
+    en torno a `batch_bytes` más una línea.
+    """
+    report = ImportReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def prepare_line(line_no: int, item: dict):
+        async with semaphore:
+            try:
+                return line_no, await prepare(item)
+            except Exception as e:
+                report.error(line_no, str(e) or type(e).__name__)
+                return line_no, None
+
+    async def flush(batch: List[Tuple[int, bytes]]):
+        # Cada línea se suelta al validarla y del modelo queda solo su dict,
+        # que `prepare` reescribe (el base64 se libera al guardar el archivo)
+        batch.reverse()
+        valid = []
+        while batch:
+            line_no, raw = batch.pop()
+            try:
+                valid.append((line_no, model.model_validate(json.loads(raw)).dict()))
+            except ValidationError as e:
+                report.error(line_no, format_validation_error(e))
+            except ValueError as e:
+                report.error(line_no, f"Invalid JSON: {e}")
+        prepared = await asyncio.gather(*(prepare_line(n, item) for n, item in valid))
+        prepared = [(n, doc) for n, doc in prepared if doc is not None]
+        failures = await commit([doc for _, doc in prepared])
+        for index, (line_no, _) in enumerate(prepared):
+            if index in failures:
+                report.error(line_no, failures[index])
+            else:
+                report.inserted += 1
+
+    batch: List[Tuple[int, bytes]] = []
+    pending_bytes = 0
+    line_no = 0
+    try:
+        async for line_no, raw in read_ndjson_lines(stream, max_line_bytes):
+            batch.append((line_no, raw))
+            pending_bytes += len(raw)
+            if len(batch) >= batch_size or pending_bytes >= batch_bytes:
+                pending, batch, pending_bytes = batch, [], 0
+                await flush(pending)
+    except ValueError as e:
+        # Línea demasiado larga: se importa lo ya leído y se detiene
+        report.error(line_no + 1, str(e))
+    if batch:
+        await flush(batch)
+    report.errors.sort(key=lambda e: e["line"])
+    return report
@@ -0,0 +1,194 @@
+import os
+import zlib
+from typing import Optional
+
+try:  # Compresión brotli opcional (pip install brotli)
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Compresión de las respuestas JSON dinámicas (los archivos estáticos se
+# sirven precomprimidos desde disco, ver static_files.py)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+COMPRESSIBLE_TYPES = (b"application/json", b"application/x-ndjson")
+# Un ETag fuerte identifica bytes exactos: cada codificación lleva el suyo
+ETAG_SUFFIXES = {"gzip": b"-gzip", "br": b"-br"}
+
+
+def accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """Codificación preferida por el cliente entre br y gzip (None si ninguna)."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(available, key=lambda name: weights.get(name, 0.0))
+    return best if weights.get(best, 0.0) > 0 else None
+
+
+def encoded_etag(etag: bytes, encoding: str) -> bytes:
+    """ETag de la respuesta comprimida: "abc" -> "abc-gzip". Los débiles no cambian."""
+    if etag.startswith(b'"') and etag.endswith(b'"') and len(etag) > 1:
+        return etag[:-1] + ETAG_SUFFIXES[encoding] + b'"'
+    return etag
+
+
+def identity_etag(etag: bytes) -> bytes:
+    """ETag de la representación sin comprimir a partir de cualquiera de sus formas."""
+    for suffix in ETAG_SUFFIXES.values():
+        if etag.endswith(suffix + b'"'):
+            return etag[:-len(suffix) - 1] + b'"'
+    return etag
+
+
+def vary_accept_encoding(message: dict) -> dict:
+    """
+    Añade Vary: Accept-Encoding al inicio de una respuesta que podría
+    comprimirse (JSON/NDJSON o un 304 de esas rutas), aunque esta vez vaya
+    sin comprimir: una caché compartida no debe servirla a otros clientes.
+    """
+    headers = message["headers"]
+    content_type = b""
+    vary = None
+    for index, (key, value) in enumerate(headers):
+        key = key.lower()
+        if key == b"content-type":
+            content_type = value
+        elif key == b"vary":
+            vary = index
+    if message["status"] != 304 and not content_type.startswith(COMPRESSIBLE_TYPES):
+        return message
+    if vary is None:
+        return {**message, "headers": list(headers) + [(b"vary", b"Accept-Encoding")]}
+    if b"accept-encoding" in headers[vary][1].lower():
+        return message
+    headers = list(headers)
+    headers[vary] = (headers[vary][0], headers[vary][1] + b", Accept-Encoding")
+    return {**message, "headers": headers}
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Z_SYNC_FLUSH: el cliente puede descomprimir cada trozo al recibirlo
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime con brotli o gzip (según Accept-Encoding) las
+    respuestas 200 de tipo JSON o NDJSON. Un cuerpo único se comprime entero
+    si supera `minimum_size`; una respuesta en streaming se comprime trozo a
+    trozo, sin acumularla. Un ETag fuerte recibe el sufijo de la codificación
+    ("abc-gzip"), también en los 304 cuyo If-None-Match traía esa forma.
+    Toda respuesta comprimible lleva Vary: Accept-Encoding, se comprima o no.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES,
+                 gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, encoding: str):
+        return _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = accepted_encoding(accept_encoding) if accept_encoding else None
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"")
+        if encoding is None or scope["method"] == "HEAD":
+            async def send_with_vary(message):
+                if message["type"] == "http.response.start":
+                    message = vary_accept_encoding(message)
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict(message["headers"])
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] == 304 and b"etag" in headers:
+                    # Repetir la forma del ETag que el cliente tiene guardada
+                    etag = encoded_etag(headers[b"etag"], encoding)
+                    if etag in [c.strip() for c in if_none_match.split(b",")]:
+                        message = {**message, "headers": [
+                            (k, etag if k.lower() == b"etag" else v) for k, v in message["headers"]
+                        ]}
+                if (
+                    message["status"] != 200
+                    or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(vary_accept_encoding(message) if b"content-encoding" not in headers else message)
+                else:
+                    start_message = message
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(vary_accept_encoding(start_message))
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers = [
+                    (k, encoded_etag(v, encoding) if k.lower() == b"etag" else v)
+                    for k, v in start_message["headers"]
+                    if k.lower() != b"content-length"
+                ]
+                headers.append((b"content-encoding", encoding.encode("ascii")))
+                if not more:
+                    body = compressor.finish(body)
+                    headers.append((b"content-length", str(len(body)).encode("ascii")))
+                    await send(vary_accept_encoding({**start_message, "headers": headers}))
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(vary_accept_encoding({**start_message, "headers": headers}))
+            payload = compressor.chunk(body) if more else compressor.finish(body)
+            if payload or not more:
+                await send({"type": "http.response.body", "body": payload, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
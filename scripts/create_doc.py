@@ -1,13 +1,34 @@
 import base64
+import gzip
+import hashlib
 import uuid
 import os
 from pathlib import Path
 
+try:  # Compresión brotli opcional (pip install brotli)
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Tipos de texto que se sirven precomprimidos (.gz / .br junto al original)
+PRECOMPRESSED_EXTENSIONS = {"csv", "json", "xml", "txt"}
+
 def save_base64_document(base64_str: str, folder: str = "uploads/documents") -> str:
     """
     Guarda un archivo codificado en base64 en el sistema de archivos.
     Devuelve la ruta relativa del archivo guardado.
     """
+    return store_base64_document(base64_str, folder)["url"]
+
+
+def store_base64_document(base64_str: str, folder: str = "uploads/documents",
+                          precompress_text: bool = True) -> dict:
+    """
+    Igual que save_base64_document, pero devuelve también el hash y el tamaño:
+    {"url": ..., "sha256": ..., "size": ...}. Si ya existe un archivo con el
+    mismo contenido no se vuelve a escribir. Con precompress_text=False las
+    variantes .gz/.br quedan para quien llama (la API las genera en segundo plano).
+    """
     if not base64_str or not isinstance(base64_str, str):
         raise ValueError("Invalid base64 string")
 
@@ -16,8 +37,8 @@ def save_base64_document(base64_str: str, folder: str = "uploads/documents") ->
 
     header, encoded = base64_str.split(",", 1)
 
-    if not header.startswith("data:application/"):
-        raise ValueError("Invalid document header. Expected 'data:application/...'")
+    if not header.startswith(("data:application/", "data:text/")):
+        raise ValueError("Invalid document header. Expected 'data:application/...' or 'data:text/...'")
 
     mime_type = header.split(";")[0].replace("data:", "")
     extension = get_extension_from_mime(mime_type)
@@ -31,16 +52,57 @@ def save_base64_document(base64_str: str, folder: str = "uploads/documents") ->
 
     Path(folder).mkdir(parents=True, exist_ok=True)
 
-    filename = f"{uuid.uuid4().hex}.{extension}"
+    # El nombre es el SHA-256 del contenido: la URL es inmutable
+    sha256 = hashlib.sha256(file_data).hexdigest()
+    filename = f"{sha256}.{extension}"
     filepath = Path(folder) / filename
 
-    with open(filepath, "wb") as f:
-        f.write(file_data)
+    if filepath.exists():
+        # Reutilizado: se actualiza la fecha para el margen del barrido de huérfanos
+        os.utime(filepath)
+    else:
+        tmp_path = Path(folder) / f"{uuid.uuid4().hex}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(file_data)
+        os.replace(tmp_path, filepath)
+        if precompress_text:
+            precompress(filepath)
 
     if not filepath.exists():
         raise OSError(f"File not created: {filepath}")
 
-    return f"/{folder}/{filename}"
+    return {"url": f"/{folder}/{filename}", "sha256": sha256, "size": len(file_data)}
+
+
+def is_precompressible(filepath) -> bool:
+    return Path(filepath).suffix.lstrip(".") in PRECOMPRESSED_EXTENSIONS
+
+
+def precompress(filepath: Path) -> None:
+    """
+    Para documentos de texto, escribe las variantes .gz (y .br si brotli está
+    instalado) junto al original para servirlas sin comprimir en cada petición.
+    """
+    filepath = Path(filepath)
+    if not is_precompressible(filepath) or not filepath.exists():
+        return
+    data = filepath.read_bytes()
+    compressed = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressed.append((".br", brotli.compress(data, quality=11)))
+    for suffix, payload in compressed:
+        if len(payload) >= len(data):
+            continue
+        target = filepath.with_name(filepath.name + suffix)
+        tmp_path = target.with_name(f"{uuid.uuid4().hex}.part")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, target)
+
+
+def compressed_siblings(filepath) -> list:
+    """Rutas de las variantes precomprimidas de un archivo."""
+    filepath = Path(filepath)
+    return [filepath.with_name(filepath.name + suffix) for suffix in (".gz", ".br")]
 
 
 def get_extension_from_mime(mime_type: str) -> str:
@@ -1,11 +1,30 @@
 import base64
-import uuid
-from pathlib import Path
 
-def save_base64_image(base64_str: str, folder: str = "uploads/news") -> str:
+# Firmas ("magic bytes") de los formatos de imagen aceptados
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+
+def detect_image_format(data: bytes) -> str:
+    """
+    Devuelve la extensión real de la imagen según su contenido (no según el
+    tipo declarado en el data URI), o cadena vacía si no se reconoce.
     """
-    Guarda una imagen codificada en base64 en el sistema de archivos.
-    Espera un string con formato data:image/... y devuelve la ruta relativa del archivo guardado.
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return ""
+
+
+def decode_base64_image(base64_str: str) -> bytes:
+    """
+    Valida un data URI de imagen y devuelve los bytes decodificados.
     """
     if not base64_str or not isinstance(base64_str, str):
         raise ValueError("Invalid base64 string")
@@ -23,15 +42,5 @@ def save_base64_image(base64_str: str, folder: str = "uploads/news") -> str:
     if len(file_data) > 5 * 1024 * 1024:  # 5 MB límite
         raise ValueError("Image too large (max 5MB)")
 
-    Path(folder).mkdir(parents=True, exist_ok=True)
-
-    filename = f"{uuid.uuid4().hex}.jpg"
-    filepath = Path(folder) / filename
-
-    with open(filepath, "wb") as f:
-        f.write(file_data)
-
-    if not filepath.exists():
-        raise OSError(f"File not created: {filepath}")
+    return file_data
 
-    return f"/{folder}/{filename}"
\ No newline at end of file
@@ -1,41 +1,37 @@
 import asyncio
-from passlib.context import CryptContext
-from motor.motor_asyncio import AsyncIOMotorClient
 
-# Configuración de conexión a MongoDB
-MONGO_DETAILS = "mongodb://localhost:27017"
-client = AsyncIOMotorClient(MONGO_DETAILS)
-database = client.bqverde
-
-# Colecciones de la base de datos
-user_collection = database.get_collection("users")
-ticket_collection = database.get_collection("ticket")
-counters_collection = database.get_collection("counters")
-
-# Contexto para hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from dbconection import client, user_collection
+from scripts.hashing import get_password_hash, hash_pool
 
 async def create_admin():
     """
     Crea un usuario administrador predeterminado si no existe.
+    Uso: python -m scripts.created_admin (misma configuración MONGO_* que la API).
     """
     username = "admin"
     password = "password123"  # Cambiar en producción
     email = "admin@example.com"
 
-    hashed_password = pwd_context.hash(password)
+    existing = await user_collection.find_one({"username": username})
+    if existing:
+        print("Admin ya existe")
+        return
+
+    hashed_password = await get_password_hash(password)
     user_data = {
         "username": username,
         "email": email,
         "hashed_password": hashed_password
     }
+    result = await user_collection.insert_one(user_data)
+    print(f"Admin creado con ID: {result.inserted_id}")
 
-    existing = await user_collection.find_one({"username": username})
-    if existing:
-        print("Admin ya existe")
-    else:
-        result = await user_collection.insert_one(user_data)
-        print(f"Admin creado con ID: {result.inserted_id}")
+async def main():
+    try:
+        await create_admin()
+    finally:
+        hash_pool.shutdown()
+        client.close()
 
 if __name__ == "__main__":
-    asyncio.run(create_admin())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from dbconection import client, document_collection, blob_collection
+from scripts import media_io
+from scripts.blob_store import BlobStore
+from scripts.create_doc import precompress
+
+blob_store = BlobStore(blob_collection)
+
+
+def hash_file(path: Path):
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def link_or_copy(src: Path, dst: Path):
+    """Nuevo nombre del archivo sin quitar el anterior (enlace duro o copia)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+async def drop_old_file(path: Path, url: str) -> bool:
+    """Borra el archivo de nombre aleatorio si ningún documento lo usa ya."""
+    trash = await media_io.retire_file(path)
+    if trash is None:
+        return False
+    if await document_collection.count_documents({"document_url": url}, limit=1):
+        await media_io.restore_file(trash, path)
+        return False
+    await media_io.purge_document_file(trash, path)
+    return True
+
+
+async def migrate_documents():
+    """
+    Migra los documentos guardados con nombre aleatorio al almacenamiento por
+    contenido: enlaza cada archivo como <sha256>.<ext>, actualiza el registro
+    (con nueva versión, para que la vean la caché y la sincronización) y
+    solo después borra el archivo anterior, así una interrupción nunca deja
+    registros apuntando a archivos inexistentes.
+    Uso: python -m scripts.dedupe_documents (misma configuración MONGO_* que la API).
+    """
+    migrated = duplicates = missing = kept = 0
+    async for doc in document_collection.find({"sha256": {"$exists": False}}):
+        old_url = doc["document_url"]
+        path = Path(f".{old_url}")
+        if not path.exists():
+            print(f"Advertencia: archivo no encontrado para {doc['_id']}: {path}")
+            missing += 1
+            continue
+
+        sha256, size = hash_file(path)
+        target = path.with_name(f"{sha256}{path.suffix}")
+        duplicate = target.exists()
+        if not duplicate:
+            link_or_copy(path, target)
+            precompress(target)
+
+        url = f"/{target.as_posix()}"
+        await blob_store.acquire(sha256, url, size)
+        await document_collection.update_one(
+            {"_id": doc["_id"]},
+            {
+                "$set": {"document_url": url, "sha256": sha256, "size": size, "updated_at": datetime.utcnow()},
+                "$inc": {"version": 1},
+            },
+        )
+        migrated += 1
+
+        if target != path:
+            if await drop_old_file(path, old_url):
+                duplicates += duplicate
+            else:
+                kept += 1
+
+    print(f"Migrados: {migrated}, duplicados eliminados: {duplicates}, sin archivo: {missing}")
+    if kept:
+        print(f"Advertencia: {kept} archivos anteriores siguen en uso o son recientes; los retirará el barrido de huérfanos")
+    media_io.media_pool.shutdown()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_documents())
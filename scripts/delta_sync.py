@@ -0,0 +1,105 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from scripts.pagination import decode_cursor, encode_cursor, keyset_filter, keyset_sort
+
+# Sincronización incremental (GET /news/changes?changed_since=<token>): el
+# token es la posición (updated_at, _id) del último cambio entregado, así que
+# solo crece. Las bajas se guardan como marcas ("tombstones") que Mongo borra
+# por TTL; un token más antiguo que ese plazo obliga a una sincronización
+# completa (410).
+SYNC_TOMBSTONE_TTL_S = int(os.getenv("SYNC_TOMBSTONE_TTL_S", str(30 * 24 * 3600)))
+# Los cambios de los últimos SYNC_SETTLE_MS no se entregan todavía: una
+# escritura en curso con un updated_at anterior al token no se perdería
+SYNC_SETTLE_MS = int(os.getenv("SYNC_SETTLE_MS", "2000"))
+MAX_SYNC_PAGE_SIZE = 1000
+
+# Mayor _id posible: el token (t, MAX_ID) cubre todo lo modificado hasta t
+MAX_ID = ObjectId("f" * 24)
+
+
+class SyncTokenExpired(Exception):
+    """El token es anterior a las marcas de borrado que se conservan."""
+
+
+class DeltaSync:
+    """
+    Cambios de una colección desde un token: los documentos con updated_at
+    posterior y las marcas de borrado de su tipo, mezclados en el mismo orden
+    (updated_at, _id) para poder cortar la respuesta en cualquier punto.
+    """
+
+    def __init__(self, tombstones, ttl_s: int = SYNC_TOMBSTONE_TTL_S, settle_ms: int = SYNC_SETTLE_MS):
+        self.tombstones = tombstones
+        self.ttl_s = ttl_s
+        self.settle_ms = settle_ms
+
+    async def create_indexes(self) -> None:
+        await self.tombstones.create_index([("kind", 1), ("updated_at", 1), ("_id", 1)])
+        try:
+            await self.tombstones.create_index("updated_at", expireAfterSeconds=self.ttl_s)
+        except OperationFailure as e:
+            # Cambio de SYNC_TOMBSTONE_TTL_S: hay que ajustar el índice con collMod
+            print(f"Advertencia: no se pudo crear el índice TTL de tombstones: {e}")
+
+    async def record_deletion(self, kind: str, doc_id: str) -> None:
+        await self.tombstones.insert_one({"kind": kind, "doc_id": doc_id, "updated_at": datetime.utcnow()})
+
+    async def changes(self, collection, kind: str, token: Optional[str], limit: int,
+                      projection: Optional[dict] = None) -> Tuple[List[dict], List[str], str, bool]:
+        """
+        (documentos cambiados, ids borrados, nuevo token, has_more). Sin token
+        se devuelven todos los documentos y ninguna baja. ValueError si el
+        token no es válido; SyncTokenExpired si es demasiado antiguo.
+        """
+        now = datetime.utcnow()
+        until = now - timedelta(milliseconds=self.settle_ms)
+        # Precisión de las fechas de Mongo: el token no puede caer dentro de un milisegundo
+        until = until.replace(microsecond=until.microsecond // 1000 * 1000)
+        if token:
+            since, _ = decode_cursor(token)
+            # Cursores de otros listados (p. ej. por nombre) no son tokens de sincronización
+            if not isinstance(since, datetime):
+                raise ValueError("Invalid sync token")
+            if since < now - timedelta(seconds=self.ttl_s):
+                raise SyncTokenExpired()
+        window = {"updated_at": {"$lte": until}}
+        after = keyset_filter("updated_at", token, False)
+        sort = keyset_sort("updated_at", False)
+
+        if projection is not None:
+            projection = {**projection, "updated_at": 1}
+        rows = await (
+            collection.find({"$and": [window, after]} if after else window, projection)
+            .sort(sort)
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        tombstones = []
+        if token:
+            tombstones = await (
+                self.tombstones.find({"$and": [{"kind": kind}, window, after]}, {"doc_id": 1, "updated_at": 1})
+                .sort(sort)
+                .limit(limit + 1)
+                .to_list(length=limit + 1)
+            )
+
+        merged = sorted(
+            [(r["updated_at"], r["_id"], False, r) for r in rows]
+            + [(t["updated_at"], t["_id"], True, t) for t in tombstones],
+            key=lambda entry: entry[:2],
+        )
+        has_more = len(merged) > limit
+        merged = merged[:limit]
+        if has_more:
+            next_token = encode_cursor(merged[-1][0], merged[-1][1])
+        else:
+            # Todo lo anterior a `until` ya se ha entregado
+            next_token = encode_cursor(until, MAX_ID)
+        changed = [entry[3] for entry in merged if not entry[2]]
+        deleted = [entry[3]["doc_id"] for entry in merged if entry[2]]
+        return changed, deleted, next_token, has_more
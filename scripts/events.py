@@ -0,0 +1,226 @@
+import asyncio
+import os
+from typing import Iterable, List, Optional, Set
+
+from pymongo.errors import OperationFailure
+
+from scripts.fast_json import dumps
+
+# Avisos en tiempo real (GET /events) de altas, cambios y bajas de noticias,
+# documentos y estaciones. Con replica set o mongos la fuente es un change
+# stream de la base (cada proceso ve todas las escrituras, las haga quien las
+# haga); en un Mongo standalone los propios manejadores de escritura publican
+# en este proceso (EVENTS_SOURCE=local lo fuerza).
+EVENTS_SOURCE = os.getenv("EVENTS_SOURCE", "auto")  # auto | local
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))  # eventos pendientes por cliente
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "1000"))  # por proceso
+EVENTS_HEARTBEAT_S = float(os.getenv("EVENTS_HEARTBEAT_S", "15"))
+EVENTS_RETRY_S = float(os.getenv("EVENTS_RETRY_S", "2"))
+
+TOPICS = ("news", "documents", "stations")
+OPERATIONS = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted"}
+# Código de Mongo cuando el resume token ya no está en el oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class Event:
+    """Aviso ya serializado una sola vez, compartido por todos los clientes."""
+
+    __slots__ = ("topic", "type", "data")
+
+    def __init__(self, topic: str, type: str, payload: dict):
+        self.topic = topic
+        self.type = type
+        self.data = dumps(payload)
+
+    def sse(self) -> bytes:
+        return b"event: " + self.type.encode("ascii") + b"\ndata: " + self.data + b"\n\n"
+
+
+def make_event(topic: str, operation: str, doc_id, version: Optional[int] = None) -> Event:
+    """Evento "news.created" / "news.updated" / "news.deleted" con id y versión."""
+    type = f"{topic}.{operation}"
+    payload = {"type": type, "id": str(doc_id)}
+    if version is not None:
+        payload["version"] = version
+    return Event(topic, type, payload)
+
+
+def parse_topics(topics: Optional[str]) -> Set[str]:
+    """Temas pedidos ("news,stations"); todos si no se indica ninguno."""
+    if not topics:
+        return set(TOPICS)
+    requested = {t.strip() for t in topics.split(",") if t.strip()}
+    unknown = requested - set(TOPICS)
+    if unknown:
+        raise ValueError(f"Unknown topics: {', '.join(sorted(unknown))}")
+    return requested
+
+
+# Aviso a un cliente que perdió eventos (cola llena, stream reiniciado):
+# debe volver a leer los listados que muestra
+RESYNC = Event("*", "resync", {"type": "resync"})
+
+
+class Subscription:
+    """
+    Cola acotada de un cliente. Si se llena (cliente lento) se vacía y queda
+    un único "resync": la memoria por cliente nunca pasa de `size` eventos y
+    el productor nunca espera al cliente.
+    """
+
+    def __init__(self, topics: Set[str], size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.dropped = 0
+
+    def offer(self, event: Event) -> bool:
+        if event.topic != "*" and event.topic not in self.topics:
+            return True
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait(RESYNC)
+            return False
+
+    def close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def next(self, timeout: float) -> Optional[Event]:
+        """Siguiente evento; None al cerrarse. asyncio.TimeoutError si no llega ninguno."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class EventBroker:
+    """Reparto de eventos a las suscripciones de este proceso."""
+
+    def __init__(self, db, topics: Iterable[str] = TOPICS, source: str = EVENTS_SOURCE,
+                 queue_size: int = EVENTS_QUEUE_SIZE, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.db = db
+        self.topics = tuple(topics)
+        self.requested_source = source
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.source = "local"
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.overflows = 0
+
+    @property
+    def local(self) -> bool:
+        """True si los manejadores de escritura deben publicar (sin change stream)."""
+        return self.source == "local"
+
+    # === Suscripciones ===
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscriptions) >= self.max_subscribers
+
+    def subscribe(self, topics: Iterable[str]) -> Optional[Subscription]:
+        """Nueva suscripción, o None si el proceso ya tiene el máximo de clientes."""
+        if self.full:
+            return None
+        subscription = Subscription(set(topics), self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: Event) -> None:
+        self.published += 1
+        for subscription in self._subscriptions:
+            if not subscription.offer(event):
+                self.overflows += 1
+
+    def notify(self, topic: str, operation: str, doc_ids: Iterable, version: Optional[int] = None) -> None:
+        """Publicación desde los manejadores de escritura; con change stream no hace nada."""
+        if not self.local or not self._subscriptions:
+            return
+        for doc_id in doc_ids:
+            self.publish(make_event(topic, operation, doc_id, version))
+
+    # === Change stream ===
+
+    async def _supports_change_streams(self) -> bool:
+        try:
+            hello = await self.db.command("hello")
+        except Exception:
+            return False
+        return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    def _pipeline(self) -> List[dict]:
+        # Solo lo necesario para el aviso: sin documentos completos
+        return [
+            {"$match": {"ns.coll": {"$in": list(self.topics)}, "operationType": {"$in": list(OPERATIONS)}}},
+            {"$project": {
+                "operationType": 1,
+                "ns.coll": 1,
+                "documentKey": 1,
+                "fullDocument.version": 1,
+                "updateDescription.updatedFields.version": 1,
+            }},
+        ]
+
+    @staticmethod
+    def event_from_change(change: dict) -> Event:
+        if change["operationType"] == "update":
+            version = change.get("updateDescription", {}).get("updatedFields", {}).get("version")
+        else:
+            version = (change.get("fullDocument") or {}).get("version")
+        return make_event(
+            change["ns"]["coll"], OPERATIONS[change["operationType"]], change["documentKey"]["_id"], version
+        )
+
+    async def _watch(self) -> None:
+        token = None
+        while True:
+            try:
+                async with self.db.watch(self._pipeline(), resume_after=token) as stream:
+                    async for change in stream:
+                        token = stream.resume_token
+                        self.publish(self.event_from_change(change))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Advertencia: change stream de eventos interrumpido: {e}")
+                if isinstance(e, OperationFailure) and e.code == CHANGE_STREAM_HISTORY_LOST:
+                    # Ya no se puede reanudar sin huecos: los clientes deben releer
+                    token = None
+                    self.publish(RESYNC)
+                await asyncio.sleep(EVENTS_RETRY_S)
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if self.requested_source != "local" and await self._supports_change_streams():
+            self.source = "change_stream"
+            self._task = asyncio.create_task(self._watch(), name="events-change-stream")
+        else:
+            self.source = "local"
+
+    async def stop(self) -> None:
+        """Cierra los streams abiertos (los clientes se reconectan) y el change stream."""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
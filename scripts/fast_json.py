@@ -0,0 +1,131 @@
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import orjson
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# Modo de serialización de los listados:
+#   "model"     respuesta normal de FastAPI: modelo por fila más la validación
+#               y serialización de response_model (doble pasada, json estándar)
+#   "validated" una sola validación pydantic por fila y bytes con orjson
+#   "trusted"   sin validar: los documentos de nuestras colecciones se
+#               proyectan a los campos del modelo y se escriben con orjson
+FAST_JSON_MODE = os.getenv("FAST_JSON_MODE", "model")
+FAST_JSON_MODES = ("model", "validated", "trusted")
+
+
+class ORJSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class TrustedShape:
+    """
+    Proyección de un documento de Mongo a la forma de salida de un modelo sin
+    validarlo: solo los campos del modelo (por alias), con sus valores por
+    defecto si faltan. Supone documentos escritos por esta API. Con `only`
+    se limita a esos campos (por alias).
+    """
+
+    def __init__(self, model: Type[BaseModel], only: Optional[frozenset] = None):
+        self.fields: List[Tuple[str, Callable]] = []
+        for name, field in model.model_fields.items():
+            if only is not None and (field.alias or name) not in only:
+                continue
+            if field.default_factory is not None:
+                default = field.default_factory
+            else:
+                default = (lambda value: lambda: value)(None if field.is_required() else field.default)
+            self.fields.append((field.alias or name, default))
+
+    def projection(self) -> Dict[str, int]:
+        """Proyección de Mongo con solo los campos del modelo."""
+        return {key: 1 for key, _ in self.fields}
+
+    def __call__(self, doc: dict) -> dict:
+        out = {}
+        for key, default in self.fields:
+            value = doc.get(key)
+            out[key] = default() if value is None and key not in doc else value
+        return out
+
+
+_shapes: Dict[object, TrustedShape] = {}
+
+
+def trusted_shape(model: Type[BaseModel]) -> TrustedShape:
+    shape = _shapes.get(model)
+    if shape is None:
+        shape = _shapes[model] = TrustedShape(model)
+    return shape
+
+
+def sparse_shape(model: Type[BaseModel], fields: str) -> TrustedShape:
+    """
+    Forma con solo los campos pedidos ("title,img_url,created_at"), siempre
+    con _id ("id" también vale). Lanza ValueError si alguno no es del modelo.
+    """
+    known = {field.alias or name for name, field in model.model_fields.items()}
+    requested = {"_id" if f == "id" else f for f in (f.strip() for f in fields.split(",")) if f}
+    unknown = requested - known
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    key = (model, frozenset(requested | {"_id"}))
+    shape = _shapes.get(key)
+    if shape is None:
+        shape = _shapes[key] = TrustedShape(model, key[1])
+    return shape
+
+
+def list_projection(model: Type[BaseModel]):
+    """Proyección para las consultas de listados (None salvo en modo "trusted")."""
+    return trusted_shape(model).projection() if FAST_JSON_MODE == "trusted" else None
+
+
+def _validated(model: Type[BaseModel], rows: Iterable[dict]) -> List[dict]:
+    return [model(**{**row, "_id": str(row["_id"])}).model_dump(by_alias=True) for row in rows]
+
+
+def _models(model: Type[BaseModel], rows: Iterable[dict]) -> List[BaseModel]:
+    return [model(**{**row, "_id": str(row["_id"])}) for row in rows]
+
+
+def response_mode() -> str:
+    """Modo para respuestas distintas del response_model de la ruta (no pueden ir por "model")."""
+    return "validated" if FAST_JSON_MODE == "model" else FAST_JSON_MODE
+
+
+def render_list(model: Type[BaseModel], rows: Iterable[dict]):
+    """Lista de filas como respuesta JSON según FAST_JSON_MODE."""
+    if FAST_JSON_MODE == "trusted":
+        shape = trusted_shape(model)
+        return ORJSONBytesResponse(dumps([shape(row) for row in rows]))
+    if FAST_JSON_MODE == "validated":
+        return ORJSONBytesResponse(dumps(_validated(model, rows)))
+    return _models(model, rows)
+
+
+def render_page(page_model: Type[BaseModel], model: Type[BaseModel], rows: Iterable[dict],
+                mode: Optional[str] = None, shape: Optional[TrustedShape] = None, **extra):
+    """
+    Página {"items": [...], **extra} como respuesta JSON según FAST_JSON_MODE
+    (o `mode`). Con `shape` (campos dispersos) las filas solo se proyectan.
+    """
+    mode = mode or FAST_JSON_MODE
+    if shape is not None or mode == "trusted":
+        shape = shape or trusted_shape(model)
+        return ORJSONBytesResponse(dumps({"items": [shape(row) for row in rows], **extra}))
+    if mode == "validated":
+        return ORJSONBytesResponse(dumps({"items": _validated(model, rows), **extra}))
+    return page_model(items=_models(model, rows), **extra)
@@ -0,0 +1,91 @@
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Tamaño de celda de la rejilla en grados y antigüedad máxima de la copia en
+# memoria antes de recargarla desde Mongo (cambios hechos por otros workers).
+GEO_GRID_CELL_DEG = float(os.getenv("GEO_GRID_CELL_DEG", "0.5"))
+GEO_INDEX_TTL = float(os.getenv("GEO_INDEX_TTL", "30"))
+
+
+def point(lon: float, lat: float) -> dict:
+    """Punto GeoJSON (orden lon, lat) para el índice 2dsphere."""
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+
+class GridIndex:
+    """
+    Índice espacial en memoria (rejilla regular lon/lat) para consultas por
+    rectángulo, el camino caliente del mapa al desplazarse. Guarda las
+    estaciones ya serializadas para responder sin ir a Mongo.
+    """
+
+    def __init__(self, cell_deg: float = GEO_GRID_CELL_DEG, ttl: float = GEO_INDEX_TTL):
+        self.cell_deg = cell_deg
+        self.ttl = ttl
+        self._cells: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+        self._items: Dict[str, dict] = {}
+        self._loaded_at: Optional[float] = None
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return math.floor(lon / self.cell_deg), math.floor(lat / self.cell_deg)
+
+    def upsert(self, station: dict) -> None:
+        station_id = str(station["_id"])
+        self.remove(station_id)
+        self._items[station_id] = station
+        self._cells[self._cell(station["lon"], station["lat"])].add(station_id)
+
+    def remove(self, station_id: str) -> None:
+        station = self._items.pop(str(station_id), None)
+        if station is None:
+            return
+        cell = self._cell(station["lon"], station["lat"])
+        self._cells[cell].discard(str(station_id))
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    async def ensure_fresh(self, collection) -> None:
+        """Carga (o recarga) todas las estaciones si la copia en memoria caducó."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        self._loaded_at = time.monotonic()
+        stations = await collection.find({}, {"location": 0}).to_list(length=None)
+        self._cells.clear()
+        self._items.clear()
+        for station in stations:
+            station["_id"] = str(station["_id"])
+            self.upsert(station)
+
+    def within(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+               limit: int) -> List[dict]:
+        """
+        Estaciones dentro del rectángulo. Si min_lon > max_lon el rectángulo
+        cruza el antimeridiano y se parte en dos.
+        """
+        if min_lon > max_lon:
+            ranges = [(min_lon, 180.0), (-180.0, max_lon)]
+        else:
+            ranges = [(min_lon, max_lon)]
+
+        results = []
+        for lo_lon, hi_lon in ranges:
+            x0, y0 = self._cell(lo_lon, min_lat)
+            x1, y1 = self._cell(hi_lon, max_lat)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+                candidates = self._cells.keys()  # Rectángulo enorme: recorrer solo celdas ocupadas
+                candidates = [c for c in candidates if x0 <= c[0] <= x1 and y0 <= c[1] <= y1]
+            else:
+                candidates = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+            for cell in candidates:
+                for station_id in self._cells.get(cell, ()):
+                    station = self._items[station_id]
+                    if lo_lon <= station["lon"] <= hi_lon and min_lat <= station["lat"] <= max_lat:
+                        results.append(station)
+        results.sort(key=lambda s: (s["name"], s["_id"]))
+        return results[:limit]
+
+    def stats(self) -> dict:
+        return {"stations": len(self._items), "cells": len(self._cells)}
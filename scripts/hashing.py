@@ -0,0 +1,35 @@
+import os
+
+from passlib.context import CryptContext
+
+from scripts.workers import BoundedExecutor
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt consume ~100-300 ms de CPU por operación: se ejecuta en un pool
+# aparte ("thread" o "process") con un límite de operaciones simultáneas.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_CONCURRENCY = int(
+    os.getenv("PASSWORD_HASH_CONCURRENCY", str(PASSWORD_HASH_WORKERS * 2))
+)
+
+hash_pool = BoundedExecutor(
+    "password-hash", PASSWORD_HASH_WORKERS, PASSWORD_HASH_CONCURRENCY, PASSWORD_HASH_EXECUTOR
+)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hash_pool.run(_verify, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await hash_pool.run(_hash, password)
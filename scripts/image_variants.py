@@ -0,0 +1,144 @@
+import hashlib
+import io
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image, ImageOps
+
+from scripts.create_img import decode_base64_image, detect_image_format
+
+# Anchos generados para cada imagen (solo los menores que el original)
+VARIANT_WIDTHS = tuple(
+    int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if w.strip()
+)
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+MAX_IMAGE_PIXELS = 50_000_000  # Protección contra "decompression bombs"
+
+# Formato de salida de las variantes según el formato detectado del original
+_PIL_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP", "gif": "PNG"}
+_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+
+def _encode(image: Image.Image, pil_format: str, icc_profile: Optional[bytes]) -> bytes:
+    """Codifica la imagen sin metadatos (EXIF, XMP, comentarios); conserva solo el perfil ICC."""
+    params = {"icc_profile": icc_profile} if icc_profile else {}
+    if pil_format == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        params.update(quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif pil_format == "WEBP":
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        params.update(quality=WEBP_QUALITY, method=4)
+    elif pil_format == "PNG":
+        params.update(optimize=True)
+    out = io.BytesIO()
+    image.save(out, format=pil_format, **params)
+    return out.getvalue()
+
+
+def _resize(image: Image.Image, width: int) -> Image.Image:
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def _write_files(folder: str, files) -> None:
+    """
+    Escribe (nombre, bytes) de forma atómica. Los que ya existen (mismo hash,
+    mismo contenido) solo se "tocan" para que el barrido de huérfanos, que
+    respeta un margen por fecha de modificación, no los borre en plena reutilización.
+    """
+    written = []
+    try:
+        for name, payload in files:
+            path = Path(folder) / name
+            if path.exists():
+                os.utime(path)
+                continue
+            tmp_path = path.with_name(f"{uuid.uuid4().hex}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            written.append(path)
+    except Exception:
+        for path in written:
+            path.unlink(missing_ok=True)
+        raise
+
+
+def store_base64_image(base64_str: str, folder: str = "uploads/news") -> dict:
+    """
+    Decodifica una imagen base64, detecta su formato real y guarda el original
+    sin metadatos con el SHA-256 del contenido como nombre. Las variantes se
+    generan aparte con build_variants (en segundo plano).
+    Devuelve {"img_url": ..., "img_variants": []}.
+    """
+    data = decode_base64_image(base64_str)
+    extension = detect_image_format(data)
+    if not extension:
+        raise ValueError("Unsupported image format")
+
+    image = Image.open(io.BytesIO(data))
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ValueError("Image dimensions too large")
+    image.load()
+    icc_profile = image.info.get("icc_profile")
+    image = ImageOps.exif_transpose(image)
+    image.info = {}
+
+    # Los GIF (posiblemente animados) se guardan tal cual
+    if extension == "gif":
+        original, original_ext = data, "gif"
+    else:
+        pil_format = _PIL_FORMATS[extension]
+        original, original_ext = _encode(image, pil_format, icc_profile), _EXTENSIONS[pil_format]
+    # El nombre es el SHA-256 del contenido: una URL nunca cambia de contenido
+    original_name = f"{hashlib.sha256(original).hexdigest()}.{original_ext}"
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    _write_files(folder, [(original_name, original)])
+    return {"img_url": f"/{folder}/{original_name}", "img_variants": []}
+
+
+def build_variants(img_url: str) -> List[dict]:
+    """
+    Genera, a partir del original ya guardado, las variantes por ancho más
+    versiones WebP. Pensada para el pool de imágenes; idempotente.
+    Devuelve [{"width", "format", "url"}].
+    """
+    path = Path(f".{img_url}")
+    folder = img_url.lstrip("/").rsplit("/", 1)[0]
+    stem, extension = path.stem, path.suffix.lstrip(".")
+
+    image = Image.open(path)
+    image.load()
+    icc_profile = image.info.get("icc_profile")
+    image.info = {}
+    pil_format = _PIL_FORMATS[extension]
+
+    files = []
+    variants: List[dict] = []
+    widths = [w for w in sorted(set(VARIANT_WIDTHS)) if w < image.width] + [image.width]
+    for width in widths:
+        resized = image if width == image.width else _resize(image, width)
+        formats = ["WEBP"] if width == image.width or pil_format == "WEBP" else [pil_format, "WEBP"]
+        for fmt in formats:
+            name = f"{stem}_w{width}.{_EXTENSIONS[fmt]}"
+            files.append((name, _encode(resized, fmt, icc_profile)))
+            variants.append({"width": width, "format": _EXTENSIONS[fmt], "url": f"/{folder}/{name}"})
+    _write_files(folder, files)
+    return variants
+
+
+def image_paths(img_url: Optional[str]) -> List[Path]:
+    """
+    Rutas locales (relativas al cwd) de una imagen y de todas sus variantes
+    en disco, aunque todavía no figuren en la noticia.
+    """
+    if not img_url:
+        return []
+    original = Path(f".{img_url}")
+    return [original, *original.parent.glob(f"{original.stem}_w*")]
+
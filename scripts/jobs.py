@@ -0,0 +1,198 @@
+import asyncio
+import os
+import traceback
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Cola de tareas persistente en Mongo con trabajadores asíncronos en cada
+# proceso de la API. Cada trabajador reclama una tarea con un único
+# find_one_and_update, así que con varios workers de uvicorn ninguna tarea
+# se ejecuta dos veces a la vez.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_S = float(os.getenv("JOB_POLL_INTERVAL_S", "2"))
+# Una tarea "running" cuyo plazo vence (proceso caído) vuelve a reclamarse
+JOB_LEASE_S = int(os.getenv("JOB_LEASE_S", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_S = float(os.getenv("JOB_RETRY_BASE_S", "5"))
+JOB_STOP_TIMEOUT_S = float(os.getenv("JOB_STOP_TIMEOUT_S", "10"))
+MAX_RETRY_DELAY_S = 3600
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Documentos de `jobs`: {kind, payload, status (pending|running|failed),
+    attempts, run_at, locked_until, last_error}. Las tareas terminadas se
+    borran; las que agotan los reintentos quedan en "failed" para revisarlas.
+    Las periódicas (schedule) tienen _id fijo y se reprograman tras cada
+    ejecución. Los manejadores deben ser idempotentes: tras una caída una
+    tarea puede ejecutarse de nuevo.
+    """
+
+    def __init__(self, collection, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL_S,
+                 lease_s: int = JOB_LEASE_S, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.collection = collection
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.completed = 0
+        self.retried = 0
+        self.discarded = 0
+
+    def handler(self, kind: str):
+        """Decorador: registra la corrutina que procesa las tareas de tipo `kind`."""
+        def register(fn: Handler) -> Handler:
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    async def create_indexes(self) -> None:
+        await self.collection.create_index([("status", 1), ("run_at", 1)])
+        await self.collection.create_index([("status", 1), ("locked_until", 1)])
+
+    def _new_job(self, kind: str, payload: dict, delay_s: float) -> dict:
+        now = datetime.utcnow()
+        return {
+            "kind": kind,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "run_at": now + timedelta(seconds=delay_s),
+            "created_at": now,
+        }
+
+    async def enqueue(self, kind: str, payload: dict, delay_s: float = 0) -> None:
+        await self.collection.insert_one(self._new_job(kind, payload, delay_s))
+        self._notify()
+
+    async def enqueue_many(self, kind: str, payloads: List[dict]) -> None:
+        if payloads:
+            await self.collection.insert_many([self._new_job(kind, p, 0) for p in payloads], ordered=False)
+            self._notify()
+
+    async def schedule(self, kind: str, every_s: float) -> None:
+        """Tarea periódica única para todos los procesos (la primera, tras `every_s`)."""
+        job = self._new_job(kind, {}, every_s)
+        job["_id"] = f"periodic:{kind}"
+        job["every_s"] = every_s
+        try:
+            await self.collection.insert_one(job)
+        except DuplicateKeyError:
+            await self.collection.update_one({"_id": job["_id"]}, {"$set": {"every_s": every_s}})
+
+    def _notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    # === Trabajadores ===
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = JOB_STOP_TIMEOUT_S) -> None:
+        """Deja terminar las tareas en curso (hasta `timeout`) y cancela el resto."""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._notify()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "run_at": {"$lte": now}},
+                {"status": "running", "locked_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {"status": "running", "locked_until": now + timedelta(seconds=self.lease_s)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Advertencia: no se pudo leer la cola de tareas: {e}")
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Fallo al registrar el resultado: la tarea se reintenta al vencer su plazo
+                print(f"Advertencia: no se pudo completar la tarea {job['kind']} {job['_id']}: {e}")
+
+    async def _run(self, job: dict) -> None:
+        handler = self._handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise LookupError(f"Unknown job kind: {job['kind']}")
+            await handler(job["payload"])
+        except Exception as e:
+            await self._failed(job, e)
+            return
+        self.completed += 1
+        if job.get("every_s"):
+            await self.collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": {
+                    "status": "pending",
+                    "attempts": 0,
+                    "run_at": datetime.utcnow() + timedelta(seconds=job["every_s"]),
+                }},
+            )
+        else:
+            await self.collection.delete_one({"_id": job["_id"]})
+
+    async def _failed(self, job: dict, error: Exception) -> None:
+        error_text = "".join(traceback.format_exception_only(type(error), error)).strip()
+        update = {"last_error": error_text}
+        if job["attempts"] >= self.max_attempts and not job.get("every_s"):
+            self.discarded += 1
+            update["status"] = "failed"
+            print(f"Advertencia: tarea {job['kind']} {job['_id']} descartada tras {job['attempts']} intentos: {error_text}")
+        else:
+            # Espera exponencial: 5 s, 10 s, 20 s... (las periódicas reintentan sin límite)
+            self.retried += 1
+            delay = min(JOB_RETRY_BASE_S * 2 ** (job["attempts"] - 1), MAX_RETRY_DELAY_S)
+            update.update(status="pending", run_at=datetime.utcnow() + timedelta(seconds=delay))
+        await self.collection.update_one({"_id": job["_id"]}, {"$set": update})
+
+    async def stats(self) -> dict:
+        counts = {"pending": 0, "running": 0, "failed": 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return {
+            "workers": len(self._tasks),
+            **counts,
+            "completed": self.completed,
+            "retried": self.retried,
+            "discarded": self.discarded,
+        }
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid
+
+# Resoluciones de los agregados precalculados, en segundos
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Mongo guarda fechas en UTC sin zona; el resto de la app usa utcnow()."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    offset = int((ts - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def choose_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """La resolución más fina cuyo número de puntos en la ventana no supera max_points."""
+    span = max((end - start).total_seconds(), 1)
+    for name, seconds in ROLLUP_RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return name
+    return "day"
+
+
+class MeasurementStore:
+    """
+    Lecturas de estaciones en una colección time-series de Mongo más agregados
+    min/max/sum/count por minuto, hora y día mantenidos incrementalmente en
+    cada ingesta, para que las gráficas de ventanas largas lean pocos puntos.
+    """
+
+    def __init__(self, db, readings_name: str = "measurements", rollups_name: str = "measurement_rollups"):
+        self.db = db
+        self.readings_name = readings_name
+        self.readings = db[readings_name]
+        self.rollups = db[rollups_name]
+
+    async def create_collections(self) -> None:
+        try:
+            await self.db.create_collection(
+                self.readings_name,
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "minutes"},
+            )
+        except CollectionInvalid:
+            pass  # Ya existe
+        await self.readings.create_index([("meta.station_id", 1), ("meta.variable", 1), ("ts", 1)])
+        await self.rollups.create_index(
+            [("station_id", 1), ("variable", 1), ("resolution", 1), ("bucket", 1)], unique=True
+        )
+
+    async def ingest(self, station_id: str, readings: List[dict]) -> int:
+        """
+        Inserta un lote de lecturas {"variable", "ts", "value"} con un único
+        insert_many y actualiza los agregados con un único bulk_write.
+        """
+        docs = []
+        buckets: Dict[tuple, dict] = {}
+        for reading in readings:
+            ts = to_utc_naive(reading["ts"])
+            value = float(reading["value"])
+            variable = reading["variable"]
+            docs.append({"ts": ts, "meta": {"station_id": station_id, "variable": variable}, "value": value})
+            for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+                key = (variable, resolution, bucket_start(ts, seconds))
+                agg = buckets.get(key)
+                if agg is None:
+                    buckets[key] = {"min": value, "max": value, "sum": value, "count": 1}
+                else:
+                    agg["min"] = min(agg["min"], value)
+                    agg["max"] = max(agg["max"], value)
+                    agg["sum"] += value
+                    agg["count"] += 1
+
+        if not docs:
+            return 0
+        await self.readings.insert_many(docs, ordered=False)
+        operations = [
+            UpdateOne(
+                {"station_id": station_id, "variable": variable, "resolution": resolution, "bucket": bucket},
+                {
+                    "$min": {"min": agg["min"]},
+                    "$max": {"max": agg["max"]},
+                    "$inc": {"sum": agg["sum"], "count": agg["count"]},
+                },
+                upsert=True,
+            )
+            for (variable, resolution, bucket), agg in buckets.items()
+        ]
+        await self.rollups.bulk_write(operations, ordered=False)
+        return len(docs)
+
+    async def series(self, station_id: str, variable: str, start: datetime, end: datetime,
+                     resolution: str, limit: int) -> List[dict]:
+        """Puntos {"ts", "min", "max", "avg"} de la ventana [start, end)."""
+        start, end = to_utc_naive(start), to_utc_naive(end)
+        if resolution == "raw":
+            cursor = self.readings.find(
+                {"meta.station_id": station_id, "meta.variable": variable, "ts": {"$gte": start, "$lt": end}},
+                {"_id": 0, "ts": 1, "value": 1},
+            ).sort("ts", 1).limit(limit)
+            return [
+                {"ts": r["ts"], "min": r["value"], "max": r["value"], "avg": r["value"]}
+                async for r in cursor
+            ]
+
+        seconds = ROLLUP_RESOLUTIONS[resolution]
+        cursor = self.rollups.find(
+            {
+                "station_id": station_id,
+                "variable": variable,
+                "resolution": resolution,
+                "bucket": {"$gte": bucket_start(start, seconds), "$lt": end},
+            },
+            {"_id": 0, "bucket": 1, "min": 1, "max": 1, "sum": 1, "count": 1},
+        ).sort("bucket", 1).limit(limit)
+        return [
+            {"ts": r["bucket"], "min": r["min"], "max": r["max"], "avg": r["sum"] / r["count"]}
+            async for r in cursor
+        ]
+
+
+def resolve_resolution(requested: Optional[str], start: datetime, end: datetime, max_points: int) -> str:
+    if requested in (None, "auto"):
+        return choose_resolution(to_utc_naive(start), to_utc_naive(end), max_points)
+    return requested
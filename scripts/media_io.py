@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from scripts.create_doc import store_base64_document, compressed_siblings, precompress
+from scripts.image_variants import store_base64_image, build_variants, image_paths
+from scripts.workers import BoundedExecutor
+
+# Configuración del pool de E/S de archivos (decodificación base64, escritura,
+# renombrado y borrado). Todo lo que toca disco pasa por aquí para no
+# bloquear el event loop.
+MEDIA_IO_WORKERS = int(os.getenv("MEDIA_IO_WORKERS", "4"))
+MEDIA_IO_CONCURRENCY = int(os.getenv("MEDIA_IO_CONCURRENCY", str(MEDIA_IO_WORKERS * 2)))
+
+media_pool = BoundedExecutor("media-io", MEDIA_IO_WORKERS, MEDIA_IO_CONCURRENCY)
+
+# Pool para el procesamiento de imágenes (redimensionado y recodificación),
+# intensivo en CPU: por defecto en procesos separados.
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "process")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(os.cpu_count() or 2)))
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", str(IMAGE_WORKERS * 2)))
+
+image_pool = BoundedExecutor("image", IMAGE_WORKERS, IMAGE_CONCURRENCY, IMAGE_EXECUTOR)
+
+# Borrado de archivos compartidos por contenido: una subida del mismo
+# contenido solo "toca" el archivo existente antes de insertar su
+# referencia, así que un archivo modificado hace menos de este margen no se
+# borra todavía (ver retire_file).
+FILE_DELETE_GRACE_S = int(os.getenv("FILE_DELETE_GRACE_S", "60"))
+TRASH_SUFFIX = ".trash"
+
+
+async def run_io(fn, *args, **kwargs):
+    """Ejecuta una función bloqueante de E/S en el pool de medios."""
+    return await media_pool.run(fn, *args, **kwargs)
+
+
+async def save_news_image(base64_str: str, folder: str = "uploads/news") -> dict:
+    """Guarda la imagen sin metadatos; las variantes se generan después (build_news_image_variants)."""
+    return await image_pool.run(store_base64_image, base64_str, folder)
+
+
+async def build_news_image_variants(img_url: str) -> list:
+    """Variantes por ancho y WebP de una imagen ya guardada."""
+    return await image_pool.run(build_variants, img_url)
+
+
+async def save_document(base64_str: str, folder: str = "uploads/documents") -> dict:
+    """
+    Guarda el documento por contenido; devuelve {"url", "sha256", "size"}.
+    Las variantes precomprimidas se generan aparte (precompress_document).
+    """
+    return await media_pool.run(store_base64_document, base64_str, folder, False)
+
+
+async def precompress_document(path) -> None:
+    await media_pool.run(precompress, path)
+
+
+def _retire_file(path, grace_s: float) -> Optional[str]:
+    path = Path(path)
+    trash = path.with_name(f"{path.name}.{uuid.uuid4().hex}{TRASH_SUFFIX}")
+    try:
+        os.rename(path, trash)
+    except FileNotFoundError:
+        return None
+    if time.time() - trash.stat().st_mtime < grace_s:
+        os.replace(trash, path)
+        return None
+    # Fecha actual: el barrido de huérfanos respeta el margen mientras tanto
+    os.utime(trash)
+    return str(trash)
+
+
+async def retire_file(path, grace_s: float = FILE_DELETE_GRACE_S) -> Optional[str]:
+    """
+    Primer paso de un borrado sin carreras: aparta el archivo con un rename
+    atómico (una subida concurrente ya no lo encuentra y escribe el suyo) y
+    devuelve la ruta apartada. None si no existe o si se modificó hace menos
+    de `grace_s` (se deja en su sitio). Tras volver a comprobar las
+    referencias, el llamador la borra o la devuelve con restore_file.
+    """
+    return await media_pool.run(_retire_file, path, grace_s)
+
+
+def _retire_files(paths, grace_s: float) -> List[Optional[str]]:
+    return [_retire_file(path, grace_s) for path in paths]
+
+
+async def retire_files(paths, grace_s: float = FILE_DELETE_GRACE_S) -> List[Optional[str]]:
+    """retire_file de varios archivos en una sola tarea del pool."""
+    return await media_pool.run(_retire_files, paths, grace_s)
+
+
+async def restore_file(trash, path) -> None:
+    await media_pool.run(os.replace, trash, path)
+
+
+def _purge_retired(trash, dependents, grace_s: float) -> None:
+    Path(trash).unlink(missing_ok=True)
+    # El original ya no está, pero una subida concurrente puede estar
+    # reutilizando (tocando) sus variantes: solo se borran las no tocadas
+    now = time.time()
+    for path in dependents:
+        try:
+            if now - os.stat(path).st_mtime >= grace_s:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def purge_news_image(trash, img_url: str, grace_s: float = FILE_DELETE_GRACE_S) -> None:
+    """Borra una imagen apartada con retire_file y sus variantes."""
+    await media_pool.run(_purge_retired, trash, image_paths(img_url)[1:], grace_s)
+
+
+async def purge_document_file(trash, path, grace_s: float = FILE_DELETE_GRACE_S) -> None:
+    """Borra un documento apartado con retire_file y sus variantes precomprimidas."""
+    await media_pool.run(_purge_retired, trash, compressed_siblings(path), grace_s)
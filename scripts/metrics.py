@@ -0,0 +1,319 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Límites (en segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    Métrica con etiquetas en formato de exposición de Prometheus. Las
+    actualizaciones llegan también desde hilos (monitorización de pymongo),
+    por eso cada métrica tiene su propio lock.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in values]
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in values]
+
+
+class CallbackGauge(Metric):
+    """Gauge calculado al exportar: fn() devuelve {tupla de etiquetas: valor}."""
+
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames, fn: Callable[[], Dict[tuple, float]]):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self.fn().items()
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # etiquetas -> [conteos por límite..., suma, total]
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso",
+))
+http_request_body_bytes = registry.register(Counter(
+    "http_request_body_bytes_total", "Bytes recibidos en cuerpos de peticiones (subidas)", ("route",),
+))
+mongo_command_duration = registry.register(Histogram(
+    "mongo_command_duration_seconds", "Duración de los comandos de Mongo por colección", ("collection", "command"),
+))
+mongo_command_failures = registry.register(Counter(
+    "mongo_command_failures_total", "Comandos de Mongo fallidos por colección", ("collection", "command"),
+))
+event_loop_lag = registry.register(Histogram(
+    "event_loop_lag_seconds", "Retraso del event loop respecto a la hora programada",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+))
+event_loop_lag_last = registry.register(Gauge(
+    "event_loop_lag_last_seconds", "Último retraso medido del event loop",
+))
+
+
+def register_pools(pools) -> None:
+    """Exporta la cola y el estado de los BoundedExecutor (leídos al exportar)."""
+    def stat(field):
+        return lambda: {(pool.name,): getattr(pool, field) for pool in pools}
+
+    for field, help in (
+        ("queued", "Tareas esperando un hueco en el pool"),
+        ("running", "Tareas en ejecución en el pool"),
+        ("completed", "Tareas terminadas sin error desde el arranque"),
+        ("failed", "Tareas fallidas desde el arranque"),
+    ):
+        registry.register(CallbackGauge(f"worker_pool_{field}", help, ("pool",), stat(field)))
+
+
+# === MONGO ===
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Listener de pymongo: mide cada comando por colección. Se registra en el
+    cliente de Motor con event_listeners=[...]; los eventos llegan desde los
+    hilos de Motor.
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, str] = {}
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get(event.command_name)
+        if isinstance(target, str):
+            return target
+        return event.command.get("collection", "") if event.command_name == "getMore" else ""
+
+    def started(self, event):
+        self._pending[(event.request_id, event.connection_id)] = self._collection(event)
+
+    def succeeded(self, event):
+        collection = self._pending.pop((event.request_id, event.connection_id), "")
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._pending.pop((event.request_id, event.connection_id), "")
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_command_failures.inc(1, collection, event.command_name)
+
+
+# === EVENT LOOP ===
+
+class LoopLagMonitor:
+    """Duerme `interval` segundos en bucle y registra cuánto tarda de más en despertar."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            event_loop_lag.observe(lag)
+            event_loop_lag_last.set(lag)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# === MIDDLEWARE ===
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia por plantilla de ruta (/news/{news_id},
+    no la URL concreta, para no disparar la cardinalidad) y cuenta los bytes
+    de subida. Las respuestas servidas por middlewares externos (p. ej. la
+    caché) no pasan por el router; su ruta se resuelve aparte.
+    """
+
+    def __init__(self, app, router=None, profiler=None):
+        self.app = app
+        self.router = router
+        self.profiler = profiler
+
+    def route_of(self, scope, root_path: str) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        if scope.get("root_path", "") != root_path:
+            return scope["root_path"][len(root_path):]  # Aplicación montada (archivos estáticos)
+        if self.router is not None:
+            for candidate in self.router.routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    return getattr(candidate, "path", "") or "<unmatched>"
+        return "<unmatched>"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        start = time.perf_counter()
+        status = 500
+        body_bytes = 0
+        streamed = False
+
+        async def counting_receive():
+            nonlocal body_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                body_bytes += len(message.get("body", b""))
+            return message
+
+        async def tracking_send(message):
+            nonlocal status, streamed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Sin Content-Length: streaming (listados completos, /events)
+                streamed = not any(k.lower() == b"content-length" for k, _ in message["headers"])
+            await send(message)
+
+        http_requests_in_flight.inc(1)
+        try:
+            await self.app(scope, counting_receive, tracking_send)
+        finally:
+            http_requests_in_flight.inc(-1)
+            elapsed = time.perf_counter() - start
+            route = self.route_of(scope, root_path)
+            http_request_duration.observe(elapsed, scope["method"], route, status)
+            if body_bytes:
+                http_request_body_bytes.inc(body_bytes, route)
+            # Las respuestas en streaming duran lo que el cliente las mantiene
+            # abiertas: no son peticiones lentas
+            if self.profiler is not None and not streamed:
+                self.profiler.request_finished(scope["method"], route, start, elapsed)
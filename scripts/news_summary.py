@@ -0,0 +1,23 @@
+import math
+import os
+import re
+
+# Resumen precalculado de cada noticia para la vista de listado (view=summary):
+# se guarda al crear o editar el contenido, nunca al listar.
+NEWS_EXCERPT_CHARS = int(os.getenv("NEWS_EXCERPT_CHARS", "280"))
+NEWS_READING_WPM = int(os.getenv("NEWS_READING_WPM", "200"))
+
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def summarize(content: str) -> dict:
+    """
+    Extracto en texto plano cortado en un límite de palabra y minutos de
+    lectura estimados: {"excerpt": ..., "reading_time": ...}.
+    """
+    words = _TAGS.sub(" ", content or "").split()
+    text = " ".join(words)
+    if len(text) > NEWS_EXCERPT_CHARS:
+        cut = text[:NEWS_EXCERPT_CHARS + 1].rsplit(" ", 1)[0] or text[:NEWS_EXCERPT_CHARS]
+        text = cut.rstrip(" ,.;:") + "…"
+    return {"excerpt": text, "reading_time": max(1, math.ceil(len(words) / NEWS_READING_WPM))}
@@ -0,0 +1,152 @@
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scripts.media_io import retire_files, restore_file, run_io
+
+# Barrido periódico de uploads/: borra los archivos que ninguna noticia ni
+# documento referencia (subidas interrumpidas, caídas entre la escritura y
+# el insert, temporales .tmp/.part). Solo considera archivos sin modificar
+# en ORPHAN_GRACE_S para no tocar subidas en curso; los no referenciados se
+# apartan (media_io.retire_file) y se vuelve a consultar si alguien los usa
+# antes de borrarlos.
+ORPHAN_SWEEP_INTERVAL_S = int(os.getenv("ORPHAN_SWEEP_INTERVAL_S", "3600"))
+ORPHAN_GRACE_S = int(os.getenv("ORPHAN_GRACE_S", "3600"))
+ORPHAN_BATCH_SIZE = int(os.getenv("ORPHAN_BATCH_SIZE", "500"))
+
+TEMPORARY_SUFFIXES = (".tmp", ".part", ".trash")
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def scan_folder(folder: str) -> List[Tuple[str, float]]:
+    """(nombre, mtime) de los archivos de la carpeta."""
+    if not os.path.isdir(folder):
+        return []
+    with os.scandir(folder) as entries:
+        return [(e.name, e.stat().st_mtime) for e in entries if e.is_file()]
+
+
+def remove_files(paths: List[str]) -> None:
+    for path in paths:
+        Path(path).unlink(missing_ok=True)
+
+
+def remove_stale(paths: List[str], cutoff: float) -> int:
+    """Borra los archivos que siguen sin modificar desde `cutoff` (mtime leído otra vez)."""
+    removed = 0
+    for path in paths:
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def image_owner(name: str, names: Dict[str, str]) -> Optional[str]:
+    """
+    Original del que depende una imagen: él mismo o, para una variante
+    "<hash>_w320.webp", el archivo "<hash>.<ext>" (None si ya no existe).
+    """
+    stem = name.split(".", 1)[0].partition("_w")[0]
+    return names.get(stem)
+
+
+def document_owner(name: str, names: Dict[str, str]) -> Optional[str]:
+    """Original de un documento: él mismo o, para "x.csv.gz", "x.csv"."""
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            base = name[: -len(suffix)]
+            return base if base in names else None
+    return name
+
+
+class OrphanSweeper:
+    """
+    Compara el contenido de las carpetas de subida con las colecciones, por
+    lotes: cada lote pregunta a Mongo solo por las URLs de sus archivos y se
+    borra en el pool de E/S, así el barrido nunca ocupa el event loop.
+    """
+
+    def __init__(self, news_collection, document_collection, blob_collection,
+                 news_folder: str = "uploads/news", documents_folder: str = "uploads/documents",
+                 grace_s: int = ORPHAN_GRACE_S, batch_size: int = ORPHAN_BATCH_SIZE):
+        self.news = news_collection
+        self.documents = document_collection
+        self.blobs = blob_collection
+        self.news_folder = news_folder
+        self.documents_folder = documents_folder
+        self.grace_s = grace_s
+        self.batch_size = batch_size
+        self.last_run: Optional[dict] = None
+
+    async def _referenced_images(self, urls: List[str]) -> set:
+        return set(await self.news.distinct("img_url", {"img_url": {"$in": urls}}))
+
+    async def _referenced_documents(self, urls: List[str]) -> set:
+        # Por contenido (blobs) o documentos anteriores a ese almacenamiento
+        referenced = set(await self.blobs.distinct("url", {"url": {"$in": urls}, "refs": {"$gt": 0}}))
+        referenced.update(await self.documents.distinct("document_url", {"document_url": {"$in": urls}}))
+        return referenced
+
+    async def sweep_folder(self, folder: str, owner_of: Callable, referenced: Callable) -> dict:
+        files = await run_io(scan_folder, folder)
+        # Originales por nombre y por hash (las variantes de imagen solo conocen el hash)
+        names = {name: name for name, _ in files}
+        names.update({name.split(".", 1)[0]: name for name, _ in files if "_w" not in name})
+        cutoff = time.time() - self.grace_s
+        candidates = [name for name, mtime in files if mtime < cutoff]
+
+        removed = 0
+        for start in range(0, len(candidates), self.batch_size):
+            batch = candidates[start:start + self.batch_size]
+            temporaries, orphans, owners = [], [], {}
+            for name in batch:
+                if name.endswith(TEMPORARY_SUFFIXES):
+                    temporaries.append(os.path.join(folder, name))
+                    continue
+                owner = owner_of(name, names)
+                if owner is None:
+                    orphans.append(name)
+                else:
+                    owners[name] = f"/{folder}/{owner}"
+            if temporaries:
+                removed += await run_io(remove_stale, temporaries, cutoff)
+            in_use = await referenced(sorted(set(owners.values()))) if owners else set()
+            orphans += [name for name, url in owners.items() if url not in in_use]
+            if orphans:
+                removed += await self._remove_orphans(folder, orphans, owners, referenced)
+        return {"scanned": len(files), "removed": removed}
+
+    async def _remove_orphans(self, folder: str, orphans: List[str], owners: Dict[str, str],
+                              referenced: Callable) -> int:
+        """
+        Aparta los huérfanos (los modificados desde el escaneo se quedan),
+        vuelve a consultar sus referencias y borra solo los que siguen sin
+        usarse; el resto vuelve a su sitio.
+        """
+        paths = [os.path.join(folder, name) for name in orphans]
+        trashes = await retire_files(paths, self.grace_s)
+        retired = [(name, path, trash) for name, path, trash in zip(orphans, paths, trashes) if trash]
+        urls = sorted({owners[name] for name, _, _ in retired if name in owners})
+        in_use = await referenced(urls) if urls else set()
+        purge = []
+        for name, path, trash in retired:
+            if owners.get(name) in in_use:
+                await restore_file(trash, path)
+            else:
+                purge.append(trash)
+        await run_io(remove_files, purge)
+        return len(purge)
+
+    async def run(self) -> dict:
+        started = time.perf_counter()
+        result = {
+            "news": await self.sweep_folder(self.news_folder, image_owner, self._referenced_images),
+            "documents": await self.sweep_folder(self.documents_folder, document_owner, self._referenced_documents),
+        }
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        self.last_run = result
+        return result
@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(sort_value: Any, doc_id: ObjectId) -> str:
+    """
+    Codifica la posición (valor de orden, _id) del último elemento de una página
+    como un token opaco seguro para URLs.
+    """
+    if isinstance(sort_value, datetime):
+        payload = {"t": "dt", "v": sort_value.isoformat()}
+    else:
+        payload = {"t": "s", "v": sort_value}
+    payload["id"] = str(doc_id)
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """
+    Decodifica un token generado por encode_cursor.
+    Lanza ValueError si el token no es válido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        if payload["t"] == "dt":
+            value = datetime.fromisoformat(value)
+        doc_id = ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return value, doc_id
+
+
+def keyset_filter(field: str, cursor: Optional[str], descending: bool) -> dict:
+    """
+    Construye el filtro de Mongo que continúa la paginación después del cursor,
+    usando (field, _id) como clave compuesta de orden.
+    """
+    if not cursor:
+        return {}
+    value, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {
+        "$or": [
+            {field: {op: value}},
+            {field: value, "_id": {op: doc_id}},
+        ]
+    }
+
+
+def keyset_sort(field: str, descending: bool) -> list:
+    """Orden compatible con keyset_filter (y con los índices compuestos)."""
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+
+def keyset_find(collection, query: dict, field: str, descending: bool,
+                cursor: Optional[str], projection: Optional[dict] = None):
+    """Cursor de Motor, sin límite, con los documentos posteriores al cursor de paginación."""
+    after = keyset_filter(field, cursor, descending)
+    if after:
+        query = {"$and": [query, after]} if query else after
+    return collection.find(query, projection).sort(keyset_sort(field, descending))
+
+
+async def fetch_page(collection, query: dict, field: str, descending: bool,
+                     cursor: Optional[str], limit: int, projection: Optional[dict] = None):
+    """
+    Devuelve (documentos, next_cursor) para una página de la colección.
+    Pide limit + 1 elementos para saber si existe una página siguiente.
+    Si se da una proyección debe incluir `field` para construir el cursor.
+    """
+    docs = await (
+        keyset_find(collection, query, field, descending, cursor, projection)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(field), last["_id"])
+    return docs, next_cursor
@@ -0,0 +1,141 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from typing import Optional
+
+# Perfilador por muestreo de peticiones lentas. Desactivado salvo que se
+# defina un umbral (o se active desde /internal/profiler).
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+MAX_SAMPLES = 24_000  # ~2 minutos a 5 ms
+# Pilas distintas recordadas: cada muestra comparte la cadena de su pila
+MAX_STACKS = 10_000
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold(frame) -> str:
+    """Pila en formato "folded" (raíz;...;hoja), el que leen flamegraph.pl y speedscope."""
+    names = []
+    while frame is not None:
+        names.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def stack_key(frame) -> tuple:
+    """Clave barata de una pila (sus objetos de código) para no volver a formatearla."""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    return tuple(codes)
+
+
+class SlowRequestProfiler:
+    """
+    Un hilo toma cada `interval_ms` la pila del hilo del event loop y la
+    guarda con su marca de tiempo. Cuando una petición supera `threshold_ms`,
+    las muestras tomadas durante su ejecución se escriben (desde el mismo
+    hilo, nunca desde el event loop) en PROFILE_DIR como un archivo .folded.
+    Con peticiones concurrentes las muestras incluyen el trabajo de todas
+    las que compartían el loop en ese intervalo. Las muestras guardan una
+    referencia a la cadena de su pila, formateada una sola vez por pila
+    distinta, así que la memoria depende de las pilas distintas y no de su
+    profundidad por muestra.
+    """
+
+    def __init__(self, threshold_ms: float = PROFILE_SLOW_MS, interval_ms: float = PROFILE_INTERVAL_MS,
+                 folder: str = PROFILE_DIR):
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.folder = folder
+        self.dumped = 0
+        self._samples: deque = deque(maxlen=MAX_SAMPLES)
+        self._stacks: dict = {}
+        self._slow: SimpleQueue = SimpleQueue()
+        self._target: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self, threshold_ms: Optional[float] = None) -> None:
+        """Empieza a muestrear el hilo actual (debe llamarse desde el event loop)."""
+        if threshold_ms is not None:
+            self.threshold_ms = threshold_ms
+        if self._thread is not None or self.threshold_ms <= 0:
+            return
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._samples.clear()
+        self._stacks.clear()
+
+    def request_finished(self, method: str, route: str, start: float, elapsed: float) -> None:
+        """Llamado por el middleware de métricas al terminar cada petición."""
+        if self._thread is not None and elapsed * 1000 >= self.threshold_ms:
+            self._slow.put((method, route, start, start + elapsed))
+
+    def _run(self) -> None:
+        interval = self.interval_ms / 1000
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self._samples.append((time.perf_counter(), self._folded(frame)))
+            del frame
+            try:
+                while True:
+                    self._dump(*self._slow.get_nowait())
+            except Empty:
+                pass
+
+    def _folded(self, frame) -> str:
+        key = stack_key(frame)
+        stack = self._stacks.get(key)
+        if stack is None:
+            if len(self._stacks) >= MAX_STACKS:
+                self._stacks.clear()
+            stack = self._stacks[key] = fold(frame)
+        return stack
+
+    def _dump(self, method: str, route: str, start: float, end: float) -> None:
+        stacks = Counter(stack for ts, stack in list(self._samples) if start <= ts <= end)
+        if not stacks:
+            return
+        Path(self.folder).mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}_{method}_{slug}_{int((end - start) * 1000)}ms.folded"
+        with open(Path(self.folder) / name, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.dumped += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": self.interval_ms,
+            "samples": len(self._samples),
+            "stacks": len(self._stacks),
+            "dumped": self.dumped,
+        }
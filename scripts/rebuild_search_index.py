@@ -0,0 +1,22 @@
+import asyncio
+
+from dbconection import client, db, news_collection, document_collection
+from scripts.search_index import SearchIndex
+
+search_index = SearchIndex(db["search_postings"], db["search_docs"], db["search_stats"])
+
+
+async def rebuild():
+    """
+    Reconstruye el índice de búsqueda desde cero. Necesario una sola vez para
+    los registros creados antes de que existiera el índice incremental.
+    Uso: python -m scripts.rebuild_search_index (misma configuración MONGO_* que la API).
+    """
+    await search_index.create_indexes()
+    indexed = await search_index.rebuild({"news": news_collection, "documents": document_collection})
+    print(f"Registros indexados: {indexed}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+try:  # Backend compartido opcional (pip install redis)
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+from scripts.compression import identity_etag
+
+
+class CachedResponse:
+    """Respuesta ya serializada: estado, cabeceras, cuerpo y ETag fuerte."""
+
+    __slots__ = ("status", "headers", "body", "etag")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, etag: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+
+    def dumps(self) -> bytes:
+        meta = {
+            "status": self.status,
+            "etag": self.etag.decode("latin-1"),
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers],
+        }
+        return json.dumps(meta).encode("utf-8") + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedResponse":
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]]
+        return cls(meta["status"], headers, body, meta["etag"].encode("latin-1"))
+
+
+class MemoryBackend:
+    """
+    Backend en proceso con expulsión LRU acotada por bytes totales.
+    Cada worker tiene su propia copia: las invalidaciones de otro worker solo
+    se notan al expirar el TTL. Para compartir entre workers usar RedisBackend.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations = {}
+        self.size_bytes = 0
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        self._discard(key)
+        self._entries[key] = (response, time.monotonic() + self.ttl)
+        self.size_bytes += len(response.body)
+        while self.size_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        for key in [k for k in self._entries if k.startswith(f"{namespace}:")]:
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[0].body)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "entries": len(self._entries), "bytes": self.size_bytes}
+
+
+class RedisBackend:
+    """Backend compartido por todos los workers (requiere el paquete `redis`)."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "bqverde:http:"):
+        if aioredis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package")
+        self._redis = aioredis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self._redis.get(self.prefix + key)
+        return CachedResponse.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        await self._redis.set(self.prefix + key, response.dumps(), ex=self.ttl)
+
+    async def generation(self, namespace: str) -> int:
+        value = await self._redis.get(f"{self.prefix}gen:{namespace}")
+        return int(value or 0)
+
+    async def bump(self, namespace: str) -> None:
+        await self._redis.incr(f"{self.prefix}gen:{namespace}")
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class ResponseCache:
+    """
+    Caché de respuestas GET agrupadas por espacio de nombres (primer segmento
+    de la ruta). Invalidar un espacio incrementa su generación, de modo que las
+    claves antiguas dejan de consultarse sin tener que recorrerlas.
+    """
+
+    def __init__(self, backend, max_entry_bytes: int):
+        self.backend = backend
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def key_for(self, namespace: str, path: str, query_string: bytes) -> str:
+        generation = await self.backend.generation(namespace)
+        return f"{namespace}:{generation}:{path}?{query_string.decode('latin-1')}"
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            await self.backend.bump(namespace)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            **self.backend.stats(),
+        }
+
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.sha256(body).hexdigest()[:32].encode("ascii") + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    if if_none_match.strip() == b"*":
+        return True
+    # El ETag puede venir de una respuesta comprimida ("abc-gzip")
+    candidates = [identity_etag(c.strip()) for c in if_none_match.split(b",")]
+    return etag in candidates or b"W/" + etag in candidates
+
+
+def path_namespace(path: str) -> str:
+    """Espacio de invalidación por defecto: el primer segmento de la ruta."""
+    return path.strip("/").split("/", 1)[0]
+
+
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI que sirve desde caché las respuestas GET de las rutas
+    indicadas y responde 304 cuando If-None-Match coincide con el ETag, sin
+    llegar al handler (ni a Mongo). Las respuestas más grandes que
+    max_entry_bytes se transmiten tal cual, sin almacenarse. `namespace_of`
+    decide qué invalidate() vacía cada ruta.
+    """
+
+    def __init__(self, app, cache: ResponseCache, prefixes=("/news", "/documents", "/stations"),
+                 namespace_of: Callable[[str], str] = path_namespace):
+        self.app = app
+        self.cache = cache
+        self.prefixes = tuple(prefixes)
+        self.namespace_of = namespace_of
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        namespace = self.namespace_of(scope["path"])
+        key = await self.cache.key_for(namespace, scope["path"], scope["query_string"])
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+
+        cached = await self.cache.backend.get(key)
+        if cached is not None:
+            self.cache.hits += 1
+            await self._send_cached(cached, if_none_match, send)
+            return
+        self.cache.misses += 1
+
+        start_message = None
+        chunks = []
+        buffered = 0
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, buffered, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                # Errores y respuestas en streaming (sin Content-Length) no se almacenan
+                if message["status"] != 200 or b"content-length" not in dict(message["headers"]):
+                    passthrough = True
+                    await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            chunks.append(body)
+            buffered += len(body)
+            if buffered > self.cache.max_entry_bytes:
+                # Demasiado grande para la caché: se envía lo acumulado y se sigue en streaming
+                passthrough = True
+                await send(start_message)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": more})
+                chunks.clear()
+                return
+            if more:
+                return
+
+            payload = b"".join(chunks)
+            headers = [(k, v) for k, v in start_message["headers"] if k.lower() != b"content-length"]
+            etag = dict(headers).get(b"etag") or make_etag(payload)
+            headers = [(k, v) for k, v in headers if k.lower() != b"etag"]
+            headers.append((b"etag", etag))
+            if b"cache-control" not in dict(headers):
+                headers.append((b"cache-control", b"no-cache"))
+            response = CachedResponse(200, headers, payload, etag)
+            await self.cache.backend.set(key, response)
+            await self._send_cached(response, if_none_match, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_cached(self, cached: CachedResponse, if_none_match, send):
+        if if_none_match and etag_matches(if_none_match, cached.etag):
+            self.cache.not_modified += 1
+            headers = [(k, v) for k, v in cached.headers if k.lower() in (b"etag", b"cache-control", b"vary")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = cached.headers + [(b"content-length", str(len(cached.body)).encode("ascii"))]
+        await send({"type": "http.response.start", "status": cached.status, "headers": headers})
+        await send({"type": "http.response.body", "body": cached.body})
+
+
+def build_response_cache() -> ResponseCache:
+    """Crea la caché según RESPONSE_CACHE_BACKEND (memory | redis)."""
+    ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    max_entry_bytes = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+    backend_name = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    if backend_name == "redis":
+        backend = RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl)
+    elif backend_name == "memory":
+        max_bytes = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        backend = MemoryBackend(max_bytes, ttl)
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend_name}")
+    return ResponseCache(backend, max_entry_bytes)
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import DeleteMany, InsertOne
+
+# Campos indexados por tipo y su peso (un término del título cuenta más)
+INDEXED_FIELDS = {
+    "news": {"title": 3, "content": 1},
+    "documents": {"name": 3, "autor": 2, "description": 1},
+}
+TITLE_FIELDS = {"news": "title", "documents": "name"}
+
+# Postings leídas por término y tipo, de mayor a menor frecuencia: acota el
+# coste de los términos muy comunes (los registros donde apenas aparecen no
+# llegarían a las primeras posiciones)
+SEARCH_MAX_POSTINGS_PER_TERM = int(os.getenv("SEARCH_MAX_POSTINGS_PER_TERM", "2000"))
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual
+cuando de del desde donde durante e el ella ellas ellos en entre era eran es
+esa esas ese eso esos esta estan estas este esto estos fue fueron ha han hasta
+hay la las le les lo los mas me mi mis muy ni no nos o os otra otras otro otros
+para pero por porque que se sea segun ser si sin sobre son su sus tambien te
+tiene tienen todo todos tu tus un una unas uno unos y ya
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin acentos ("Conservación" -> "conservacion")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    """Reducción muy ligera de plurales en español."""
+    if len(token) > 4 and token.endswith("es") and token[-3] not in "aeiou":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and token[-2] in "aeiou":
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [
+        stem(token)
+        for token in _TOKEN_RE.findall(normalize(text))
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def term_frequencies(kind: str, record: dict) -> Counter:
+    frequencies = Counter()
+    for field, weight in INDEXED_FIELDS[kind].items():
+        for token in tokenize(record.get(field)):
+            frequencies[token] += weight
+    return frequencies
+
+
+class SearchIndex:
+    """
+    Índice invertido persistido en Mongo y mantenido incrementalmente desde
+    los handlers de escritura. `search_postings` guarda (término, registro,
+    frecuencia); `search_docs` la longitud de cada registro indexado y
+    `search_stats` los totales por tipo que necesita BM25. Una búsqueda solo
+    lee las listas de los términos consultados, nunca las colecciones.
+    """
+
+    def __init__(self, postings, docs, stats, k1: float = 1.2, b: float = 0.75,
+                 max_postings_per_term: int = SEARCH_MAX_POSTINGS_PER_TERM):
+        self.postings = postings
+        self.docs = docs
+        self.stats = stats
+        self.k1 = k1
+        self.b = b
+        self.max_postings_per_term = max_postings_per_term
+
+    async def create_indexes(self) -> None:
+        # Lectura por término ordenada por tf y conteo de df sobre el índice
+        await self.postings.create_index([("term", 1), ("kind", 1), ("tf", -1)])
+        await self.postings.create_index([("kind", 1), ("ref", 1)])
+
+    async def index(self, kind: str, record: dict) -> None:
+        """Indexa (o reindexa) un registro de news o documents."""
+        ref = str(record["_id"])
+        frequencies = term_frequencies(kind, record)
+        length = sum(frequencies.values())
+        previous = await self.docs.find_one_and_replace(
+            {"_id": f"{kind}:{ref}"},
+            {"kind": kind, "ref": ref, "length": length, "title": record.get(TITLE_FIELDS[kind])},
+            upsert=True,
+        )
+        operations = [DeleteMany({"kind": kind, "ref": ref})]
+        operations += [
+            InsertOne({"term": term, "kind": kind, "ref": ref, "tf": tf})
+            for term, tf in frequencies.items()
+        ]
+        await self.postings.bulk_write(operations, ordered=True)
+        delta_count = 0 if previous else 1
+        delta_length = length - (previous["length"] if previous else 0)
+        await self.stats.update_one(
+            {"_id": kind}, {"$inc": {"count": delta_count, "total_length": delta_length}}, upsert=True
+        )
+
+    async def index_many(self, kind: str, records: List[dict]) -> None:
+        """Indexa en lote registros recién creados (sin entradas previas en el índice)."""
+        if not records:
+            return
+        docs, postings, total_length = [], [], 0
+        for record in records:
+            ref = str(record["_id"])
+            frequencies = term_frequencies(kind, record)
+            length = sum(frequencies.values())
+            total_length += length
+            docs.append({
+                "_id": f"{kind}:{ref}", "kind": kind, "ref": ref,
+                "length": length, "title": record.get(TITLE_FIELDS[kind]),
+            })
+            postings += [
+                {"term": term, "kind": kind, "ref": ref, "tf": tf}
+                for term, tf in frequencies.items()
+            ]
+        await self.docs.insert_many(docs, ordered=False)
+        if postings:
+            await self.postings.insert_many(postings, ordered=False)
+        await self.stats.update_one(
+            {"_id": kind}, {"$inc": {"count": len(docs), "total_length": total_length}}, upsert=True
+        )
+
+    async def remove(self, kind: str, ref) -> None:
+        ref = str(ref)
+        previous = await self.docs.find_one_and_delete({"_id": f"{kind}:{ref}"})
+        if previous is None:
+            return
+        await self.postings.delete_many({"kind": kind, "ref": ref})
+        await self.stats.update_one(
+            {"_id": kind}, {"$inc": {"count": -1, "total_length": -previous["length"]}}
+        )
+
+    async def _term_postings(self, term: str, kind: str):
+        """(df exacto, postings con mayor tf) de un término en un tipo."""
+        query = {"term": term, "kind": kind}
+        df, postings = await asyncio.gather(
+            self.postings.count_documents(query),
+            self.postings.find(query, {"_id": 0, "ref": 1, "tf": 1})
+            .sort("tf", -1)
+            .limit(self.max_postings_per_term)
+            .to_list(length=self.max_postings_per_term),
+        )
+        return term, kind, df, postings
+
+    async def search(self, query: str, kinds: Iterable[str], limit: int, offset: int = 0):
+        """
+        Devuelve (resultados, total) ordenados por puntuación BM25, donde cada
+        resultado es {"type", "id", "score", "title"}. Por término solo se
+        puntúan las max_postings_per_term postings de mayor frecuencia, así
+        que con términos muy comunes `total` es una cota inferior.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        kinds = list(kinds)
+        if not terms:
+            return [], 0
+
+        stats = {s["_id"]: s async for s in self.stats.find({"_id": {"$in": kinds}})}
+        tfs: Dict[tuple, Dict[str, int]] = defaultdict(dict)
+        document_frequency: Dict[tuple, int] = {}
+        for term, kind, df, postings in await asyncio.gather(
+            *(self._term_postings(term, kind) for term in terms for kind in kinds)
+        ):
+            document_frequency[(kind, term)] = df
+            for posting in postings:
+                tfs[(kind, posting["ref"])][term] = posting["tf"]
+        if not tfs:
+            return [], 0
+
+        keys = [f"{kind}:{ref}" for kind, ref in tfs]
+        docs = {d["_id"]: d async for d in self.docs.find({"_id": {"$in": keys}})}
+
+        scored = []
+        for (kind, ref), term_tfs in tfs.items():
+            doc = docs.get(f"{kind}:{ref}")
+            kind_stats = stats.get(kind)
+            if doc is None or not kind_stats or kind_stats["count"] <= 0:
+                continue
+            n = kind_stats["count"]
+            avgdl = max(kind_stats["total_length"] / n, 1.0)
+            norm = self.k1 * (1 - self.b + self.b * doc["length"] / avgdl)
+            score = 0.0
+            for term, tf in term_tfs.items():
+                df = document_frequency[(kind, term)]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + norm)
+            scored.append((round(score, 6), kind, ref, doc.get("title")))
+
+        # Solo se ordenan los que llegan a la página pedida
+        top = heapq.nsmallest(offset + limit, scored, key=lambda hit: (-hit[0], hit[2]))
+        hits = [{"type": kind, "id": ref, "score": score, "title": title} for score, kind, ref, title in top]
+        return hits[offset:], len(scored)
+
+    async def rebuild(self, collections: Dict[str, object]) -> int:
+        """Reconstruye el índice completo a partir de las colecciones dadas por tipo."""
+        await self.postings.delete_many({})
+        await self.docs.delete_many({})
+        await self.stats.delete_many({})
+        indexed = 0
+        for kind, collection in collections.items():
+            projection = {field: 1 for field in INDEXED_FIELDS[kind]}
+            async for record in collection.find({}, projection):
+                await self.index(kind, record)
+                indexed += 1
+        return indexed
@@ -0,0 +1,163 @@
+"""
+Arranque del servidor en modo desarrollo o producción.
+
+    python -m scripts.serve --mode dev                 # un proceso con recarga
+    python -m scripts.serve --mode prod                # un worker por núcleo
+    python -m scripts.serve --mode prod --workers 8 --max-requests 50000
+Las opciones también se leen de SERVER_* (ver argumentos).
+
+Con más de un worker la caché de respuestas debe ser compartida
+(RESPONSE_CACHE_BACKEND=redis): la caché en memoria de cada worker no ve las
+invalidaciones de los demás. Sin Redis el TTL baja a MULTI_WORKER_CACHE_TTL_S.
+"""
+import argparse
+import importlib
+import logging
+import os
+import random
+
+import uvicorn
+from uvicorn.config import Config
+from uvicorn.server import Server
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# TTL de la caché en memoria con varios workers: límite de datos obsoletos
+MULTI_WORKER_CACHE_TTL_S = 5
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def default_workers() -> int:
+    return _env_int("SERVER_WORKERS", os.cpu_count() or 1)
+
+
+def _available(module: str, fallback: str, name: str) -> str:
+    try:
+        importlib.import_module(module)
+        return name
+    except ImportError:
+        return fallback
+
+
+def size_worker_pools(workers: int) -> None:
+    """
+    Reparte los núcleos entre los workers: sin esto cada proceso crearía sus
+    propios pools de imágenes y de hash del tamaño de la máquina completa.
+    Solo fija valores por defecto; las variables ya definidas se respetan.
+    """
+    per_worker = str(max(1, (os.cpu_count() or 1) // workers))
+    os.environ.setdefault("IMAGE_WORKERS", per_worker)
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", per_worker)
+
+
+def check_response_cache(workers: int) -> None:
+    """
+    Avisa si varios workers usan la caché en memoria (cada uno con su copia)
+    y, salvo que RESPONSE_CACHE_TTL esté definido, reduce su TTL para acotar
+    el tiempo que un worker sirve respuestas ya invalidadas en otro.
+    """
+    if workers <= 1 or os.getenv("RESPONSE_CACHE_BACKEND", "memory") == "redis":
+        return
+    ttl = os.environ.setdefault("RESPONSE_CACHE_TTL", str(MULTI_WORKER_CACHE_TTL_S))
+    print(
+        f"Advertencia: {workers} workers con la caché de respuestas en memoria; las "
+        f"invalidaciones no se comparten y un worker puede servir datos obsoletos hasta "
+        f"{ttl} s. Usar RESPONSE_CACHE_BACKEND=redis."
+    )
+
+
+class RecyclingServer(Server):
+    """
+    Server que, ya dentro de cada worker, añade un margen aleatorio al límite
+    de peticiones para que los workers no se reciclen todos a la vez.
+    """
+
+    def __init__(self, config: Config, jitter: int = 0):
+        super().__init__(config)
+        self.jitter = jitter
+
+    def run(self, sockets=None):
+        if self.config.limit_max_requests and self.jitter:
+            self.config.limit_max_requests += random.randint(0, self.jitter)
+        return super().run(sockets=sockets)
+
+
+def run_development(app: str, host: str, port: int) -> None:
+    """Un solo proceso con recarga al cambiar el código (solo desarrollo)."""
+    uvicorn.run(app, host=host, port=port, reload=True)
+
+
+def run_production(app: str, host: str, port: int, workers: int, max_requests: int,
+                   max_requests_jitter: int, graceful_timeout: int, backlog: int) -> None:
+    """
+    N workers (procesos) compartiendo el socket, con uvloop y httptools si
+    están instalados. Ante SIGTERM cada worker deja de aceptar conexiones,
+    espera hasta `graceful_timeout` segundos a las peticiones en curso y
+    ejecuta el cierre del lifespan (readiness a 503, pools, Mongo). Un worker
+    que muere o alcanza `max_requests` es reemplazado por el supervisor.
+    """
+    size_worker_pools(workers)
+    check_response_cache(workers)
+    # Precarga: importar la app en el padre hace fallar el despliegue antes
+    # de ocupar el puerto si la configuración o el código están rotos. Los
+    # workers se lanzan con spawn y vuelven a importarla.
+    module, _, attribute = app.partition(":")
+    getattr(importlib.import_module(module), attribute)
+
+    config = Config(
+        app,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=_available("uvloop", "asyncio", "uvloop"),
+        http=_available("httptools", "h11", "httptools"),
+        lifespan="on",
+        proxy_headers=True,
+        server_header=False,
+        backlog=backlog,
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=graceful_timeout,
+        access_log=os.getenv("SERVER_ACCESS_LOG", "0") == "1",
+    )
+    logger.info(
+        "Producción: %d workers, loop=%s, http=%s, max_requests=%s",
+        workers, config.loop, config.http, max_requests or "-",
+    )
+    server = RecyclingServer(config, jitter=max_requests_jitter)
+    if workers <= 1:
+        server.run()
+        return
+    sock = config.bind_socket()
+    Multiprocess(config, target=server.run, sockets=[sock]).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=("dev", "prod"), default=os.getenv("SERVER_MODE", "dev"))
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=_env_int("SERVER_PORT", 8000))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--max-requests", type=int, default=_env_int("SERVER_MAX_REQUESTS", 0),
+                        help="Reciclar cada worker tras N peticiones (0 = nunca)")
+    parser.add_argument("--max-requests-jitter", type=int, default=_env_int("SERVER_MAX_REQUESTS_JITTER", 1000))
+    parser.add_argument("--graceful-timeout", type=int, default=_env_int("SERVER_GRACEFUL_TIMEOUT", 30))
+    parser.add_argument("--backlog", type=int, default=_env_int("SERVER_BACKLOG", 2048))
+    args = parser.parse_args()
+
+    if args.mode == "dev":
+        run_development(args.app, args.host, args.port)
+    else:
+        run_production(
+            args.app, args.host, args.port, args.workers, args.max_requests,
+            args.max_requests_jitter, args.graceful_timeout, args.backlog,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import re
+import stat
+from mimetypes import guess_type
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+# Archivos nombrados por el SHA-256 de su contenido (p. ej. <hash>.pdf o
+# <hash>_w320.webp): su URL nunca cambia de contenido.
+HASHED_NAME = re.compile(r"(^|/)[0-9a-f]{64}(_w\d+)?\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Extensiones con variantes precomprimidas en disco, por orden de preferencia
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+PRECOMPRESSED_TYPES = (".csv", ".json", ".xml", ".txt")
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles con cabeceras de caché según el nombre del archivo
+    (immutable para nombres con hash, revalidación para el resto) y
+    servicio de variantes .br/.gz precomprimidas cuando el cliente las acepta.
+    Las peticiones Range se sirven siempre sobre el archivo original.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = None
+        headers = Headers(scope=scope)
+        if path.endswith(PRECOMPRESSED_TYPES) and "range" not in headers:
+            response = await self._precompressed_response(path, headers, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 206, 304):
+            if HASHED_NAME.search(path):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            else:
+                response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+            if path.endswith(PRECOMPRESSED_TYPES):
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _precompressed_response(self, path: str, headers: Headers, scope):
+        accept_encoding = headers.get("accept-encoding", "")
+        for encoding, suffix in PRECOMPRESSED:
+            if not _accepts(accept_encoding, encoding):
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            media_type = guess_type(path)[0] or "application/octet-stream"
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding},
+            )
+            if self.is_not_modified(response.headers, headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
@@ -0,0 +1,54 @@
+import os
+from typing import AsyncIterator, Callable, Optional, Type
+
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+
+from scripts.fast_json import FAST_JSON_MODE, TrustedShape, dumps, trusted_shape
+
+# Listados completos en streaming: las filas se serializan según llegan del
+# cursor de Motor, así la memoria no depende del tamaño del resultado.
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))  # documentos por lote de Mongo
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(64 * 1024)))  # bytes por envío
+STREAM_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def row_serializer(model: Type[BaseModel], shape: Optional[TrustedShape] = None) -> Callable[[dict], bytes]:
+    """
+    Serializa una fila igual que los listados normales en el FAST_JSON_MODE
+    actual; con `shape` (campos dispersos) solo se proyecta.
+    """
+    if shape is not None or FAST_JSON_MODE == "trusted":
+        shape = shape or trusted_shape(model)
+        return lambda row: dumps(shape(row))
+    return lambda row: dumps(model(**{**row, "_id": str(row["_id"])}).model_dump(by_alias=True))
+
+
+async def _chunks(cursor, serialize: Callable[[dict], bytes], fmt: str) -> AsyncIterator[bytes]:
+    ndjson = fmt == "ndjson"
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    first = True
+    async for row in cursor:
+        if not ndjson and not first:
+            buffer += b","
+        buffer += serialize(row)
+        if ndjson:
+            buffer += b"\n"
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_list(model: Type[BaseModel], cursor, fmt: str, shape: Optional[TrustedShape] = None) -> StreamingResponse:
+    """
+    Respuesta en streaming con las filas de un cursor de Motor: un array JSON
+    ("json") o un objeto por línea ("ndjson"). Sin Content-Length, así que la
+    caché de respuestas no la almacena y la compresión se aplica por trozos.
+    """
+    cursor.batch_size(STREAM_BATCH_SIZE)
+    return StreamingResponse(_chunks(cursor, row_serializer(model, shape), fmt), media_type=STREAM_MEDIA_TYPES[fmt])
@@ -0,0 +1,89 @@
+from typing import Dict, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+MB = 1024 * 1024
+
+# Métodos sin cuerpo: pasan directamente sin ningún envoltorio
+BODYLESS_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def too_large_detail(limit: int) -> str:
+    return f"Request body too large (max {limit / MB:g} MB)"
+
+
+class UploadLimitMiddleware:
+    """
+    Middleware ASGI puro que limita el tamaño del cuerpo de las peticiones.
+    Rechaza con 413 según Content-Length antes de llamar a la aplicación y,
+    además, cuenta los bytes a medida que llegan, de modo que los cuerpos
+    chunked (sin Content-Length) o que mienten sobre su tamaño se cortan en
+    cuanto superan el límite, sin leerlos enteros.
+    `limits` asocia prefijos de ruta a límites; gana el prefijo más largo.
+    Un límite None deja la ruta sin límite total (p. ej. importaciones que
+    validan cada línea por su cuenta).
+    """
+
+    def __init__(self, app, default_limit: int = 50 * MB, limits: Optional[Dict[str, Optional[int]]] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = sorted((limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def limit_for(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in BODYLESS_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    await JSONResponse({"detail": "Invalid Content-Length"}, status_code=400)(scope, receive, send)
+                    return
+                if declared > limit:
+                    await self.reject(scope, receive, send, limit)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI propaga HTTPException al leer el cuerpo; la
+                    # capa de excepciones la convierte en la respuesta 413.
+                    raise HTTPException(status_code=413, detail=too_large_detail(limit))
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self.reject(scope, receive, send, limit)
+
+    async def reject(self, scope, receive, send, limit: int) -> None:
+        response = JSONResponse({"detail": too_large_detail(limit)}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable, Collection, Dict, Optional
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from scripts.create_doc import get_extension_from_mime
+from scripts.media_io import run_io
+
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024  # 50 MB
+MAX_FIELD_SIZE = 64 * 1024  # 64 KB por campo de texto
+
+
+class StreamedFile:
+    """Resultado de un archivo recibido por streaming: ruta, tamaño y hash."""
+
+    def __init__(self, path: Path, url: str, size: int, sha256: str, mime_type: str):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.sha256 = sha256
+        self.mime_type = mime_type
+
+
+class _DocumentPartWriter:
+    """
+    Callbacks para MultipartParser: los campos de texto se acumulan en memoria
+    (con un límite pequeño) y los trozos del archivo se encolan como
+    operaciones de disco que `flush` ejecuta fuera del event loop, calculando
+    tamaño y SHA-256 sobre la marcha.
+    """
+
+    def __init__(self, folder: str, file_field: str, max_size: int,
+                 allowed_fields: Optional[Collection[str]] = None):
+        self.folder = folder
+        self.file_field = file_field
+        self.max_size = max_size
+        self.allowed_fields = allowed_fields
+        self.fields: Dict[str, str] = {}
+        self.file: Optional[StreamedFile] = None
+        self._ops = []
+        self._tmp_path: Optional[Path] = None
+        self._extension = ""
+        self._fh = None
+        self._hasher = None
+        self._size = 0
+        self._mime_type = ""
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._field_name = ""
+        self._field_data = bytearray()
+        self._is_file = False
+        self._seen_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._field_name = ""
+        self._field_data = bytearray()
+        self._is_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._field_name = options.get(b"name", b"").decode("latin-1")
+        if b"filename" not in options:
+            if self.allowed_fields is not None and self._field_name not in self.allowed_fields:
+                raise ValueError(f"Unexpected field: {self._field_name}")
+            return
+        if self._field_name != self.file_field:
+            raise ValueError(f"Unexpected file field: {self._field_name}")
+        if self._seen_file:
+            raise ValueError("Only one file per upload is allowed")
+
+        mime_type, _ = parse_options_header(self._headers.get(b"content-type", b""))
+        self._mime_type = mime_type.decode("latin-1")
+        self._extension = get_extension_from_mime(self._mime_type)
+        if not self._extension:
+            raise ValueError(f"Unsupported MIME type: {self._mime_type}")
+
+        self._seen_file = True
+        self._is_file = True
+        self._size = 0
+        self._tmp_path = Path(self.folder) / f"{uuid.uuid4().hex}.part"
+        self._ops.append(self._open)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if self._is_file:
+            self._size += len(chunk)
+            if self._size > self.max_size:
+                raise ValueError(f"Document too large (max {self.max_size // (1024 * 1024)}MB)")
+            self._ops.append(partial(self._write, chunk))
+            return
+        if len(self._field_data) + len(chunk) > MAX_FIELD_SIZE:
+            raise ValueError(f"Field too large: {self._field_name}")
+        self._field_data.extend(chunk)
+
+    def on_part_end(self) -> None:
+        if not self._is_file:
+            self.fields[self._field_name] = self._field_data.decode("utf-8")
+            return
+        self._is_file = False
+        self._ops.append(self._finish)
+
+    # Operaciones de disco: se ejecutan en el pool de medios vía flush()
+
+    def _open(self) -> None:
+        Path(self.folder).mkdir(parents=True, exist_ok=True)
+        self._fh = open(self._tmp_path, "wb")
+        self._hasher = hashlib.sha256()
+
+    def _write(self, chunk: bytes) -> None:
+        self._hasher.update(chunk)
+        self._fh.write(chunk)
+
+    def _finish(self) -> None:
+        self._fh.close()
+        self._fh = None
+        # Nombre final = hash del contenido (URL inmutable)
+        sha256 = self._hasher.hexdigest()
+        final_path = Path(self.folder) / f"{sha256}.{self._extension}"
+        if final_path.exists():
+            # Mismo contenido ya almacenado: se descarta la copia temporal
+            os.remove(self._tmp_path)
+            os.utime(final_path)
+        else:
+            # Las variantes precomprimidas se generan en segundo plano (cola de tareas)
+            os.replace(self._tmp_path, final_path)
+        self._tmp_path = None
+        self.file = StreamedFile(
+            path=final_path,
+            url=f"/{self.folder}/{final_path.name}",
+            size=self._size,
+            sha256=sha256,
+            mime_type=self._mime_type,
+        )
+
+    def _apply(self, ops) -> None:
+        for op in ops:
+            op()
+
+    async def flush(self) -> None:
+        """Ejecuta las operaciones de disco pendientes fuera del event loop."""
+        if self._ops:
+            ops, self._ops = self._ops, []
+            await run_io(self._apply, ops)
+
+    def _abort(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if self._tmp_path is not None:
+            self._tmp_path.unlink(missing_ok=True)
+            self._tmp_path = None
+
+    async def abort(self) -> Optional[StreamedFile]:
+        """
+        Cierra y elimina el archivo parcial. El archivo ya completo no se
+        toca: con su nombre por contenido otra subida puede estar usándolo;
+        se devuelve para que el llamador programe un borrado que compruebe
+        las referencias.
+        """
+        self._ops = []
+        await run_io(self._abort)
+        stored, self.file = self.file, None
+        return stored
+
+
+async def receive_multipart_document(
+    request,
+    folder: str = "uploads/documents",
+    file_field: str = "file",
+    max_size: int = MAX_DOCUMENT_SIZE,
+    allowed_fields: Optional[Collection[str]] = None,
+    on_abandoned: Optional[Callable[[StreamedFile], Awaitable[None]]] = None,
+):
+    """
+    Lee un cuerpo multipart/form-data directamente del stream de la petición.
+    El archivo nunca se mantiene completo en memoria: cada trozo recibido se
+    escribe a disco (en el pool de medios) en cuanto llega. Devuelve (campos, StreamedFile).
+    Con `allowed_fields`, cualquier otro campo de texto es un error. Si
+    falla después de guardar el archivo, se entrega a `on_abandoned`.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected multipart/form-data body")
+
+    writer = _DocumentPartWriter(folder, file_field, max_size, allowed_fields)
+    parser = MultipartParser(params[b"boundary"], writer.callbacks())
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                parser.write(chunk)
+                await writer.flush()
+        parser.finalize()
+        await writer.flush()
+        if writer.file is None:
+            raise ValueError(f"Missing file field: {file_field}")
+    except BaseException:
+        abandoned = await writer.abort()
+        if abandoned is not None and on_abandoned is not None:
+            await on_abandoned(abandoned)
+        raise
+    return writer.fields, writer.file
@@ -0,0 +1,46 @@
+from typing import List, Optional
+
+from bson import ObjectId
+
+from scripts.compression import identity_etag
+
+# Control de concurrencia optimista: cada noticia, documento y estación lleva
+# un entero `version` que se incrementa en cada modificación. Los documentos
+# anteriores al campo no lo tienen y cuentan como versión 0.
+INITIAL_VERSION = 1
+
+
+def version_etag(version: Optional[int]) -> str:
+    """ETag fuerte derivado de la versión: "3"."""
+    return f'"{version or 0}"'
+
+
+def parse_if_match(header: Optional[str]) -> Optional[List[int]]:
+    """
+    Versiones aceptadas por una cabecera If-Match. None si no hay condición
+    (sin cabecera o "*"). Se aceptan las formas comprimidas ("3-gzip"); los
+    valores débiles o no numéricos nunca coinciden, así que una lista vacía
+    hace fallar la condición.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    versions = []
+    for tag in header.split(","):
+        tag = identity_etag(tag.strip().encode("latin-1")).decode("latin-1")
+        if tag.startswith('"') and tag.endswith('"') and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    return versions
+
+
+def match_filter(doc_id: ObjectId, versions: Optional[List[int]]) -> dict:
+    """Filtro por _id que además exige una de las versiones indicadas."""
+    query = {"_id": doc_id}
+    if versions is not None:
+        # {"version": None} también encuentra los documentos sin el campo
+        query["version"] = {"$in": versions + [None] if 0 in versions else versions}
+    return query
+
+
+def next_version(before: dict) -> int:
+    """Versión que deja `$inc: {"version": 1}` sobre el documento `before`."""
+    return (before.get("version") or 0) + 1
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+
+class BoundedExecutor:
+    """
+    Pool de trabajadores (hilos o procesos) con un límite de concurrencia.
+    Las tareas que exceden el límite esperan en un semáforo asíncrono sin
+    bloquear el event loop; los contadores permiten observar la cola.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_concurrency: int, kind: str = "thread"):
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        else:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Ejecuta fn(*args, **kwargs) en el pool y espera su resultado."""
+        self.queued += 1
+        waiting = True
+        try:
+            async with self._semaphore:
+                self.queued -= 1
+                waiting = False
+                self.running += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self.running -= 1
+                # Solo las terminadas sin error; los fallos van en `failed`
+                self.completed += 1
+                return result
+        finally:
+            if waiting:
+                self.queued -= 1
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def warm_up(self) -> None:
+        """
+        Arranca todos los trabajadores antes del primer uso real (en el pool
+        de procesos evita pagar el arranque de cada proceso en una petición).
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, time.sleep, 0.05) for _ in range(self.max_workers)
+        ))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
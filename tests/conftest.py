@@ -0,0 +1,13 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    """Base de datos en memoria (mongomock-motor), nueva en cada test."""
+    return AsyncMongoMockClient()["bqverde_test"]
@@ -0,0 +1,67 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+from pymongo.errors import AutoReconnect
+
+import main
+from models.models import DocumentUpdate
+from scripts.blob_store import BlobStore
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_last_release_returns_url(db):
+    blobs = BlobStore(db.blobs)
+    assert await blobs.acquire("abc", "/uploads/documents/abc.pdf", 10) is True
+    assert await blobs.acquire("abc", "/uploads/documents/abc.pdf", 10) is False
+
+    assert await blobs.release("abc") is None
+    assert await blobs.is_referenced("abc")
+    assert await blobs.release("abc") == "/uploads/documents/abc.pdf"
+    assert not await blobs.is_referenced("abc")
+    assert await blobs.release("abc") is None
+
+
+async def test_deleting_documents_schedules_file_removal_once(db, monkeypatch):
+    monkeypatch.setattr(main.blob_store, "collection", db.blobs)
+    monkeypatch.setattr(main.job_queue, "collection", db.jobs)
+    url = "/uploads/documents/abc.pdf"
+    docs = [{"sha256": "abc", "document_url": url, "size": 10} for _ in range(2)]
+    for _ in docs:
+        await main.blob_store.acquire("abc", url, 10)
+
+    await main.release_document_blob(docs[0])
+    assert await db.jobs.count_documents({}) == 0
+
+    await main.release_document_blob(docs[1])
+    job = await db.jobs.find_one({})
+    assert job["kind"] == "delete_document_file"
+    assert job["payload"] == {"url": url, "sha256": "abc"}
+    assert await db.blobs.count_documents({}) == 0
+
+
+async def test_failed_document_update_releases_new_blob(db, monkeypatch):
+    monkeypatch.setattr(main, "document_collection", db.documents)
+    monkeypatch.setattr(main.blob_store, "collection", db.blobs)
+    monkeypatch.setattr(main.job_queue, "collection", db.jobs)
+
+    async def save_document(data_uri):
+        return {"url": "/uploads/documents/new.pdf", "sha256": "new", "size": 3}
+
+    monkeypatch.setattr(main.media_io, "save_document", save_document)
+    doc_id = ObjectId()
+    await db.documents.insert_one({"_id": doc_id, "name": "d", "version": 2})
+
+    update = DocumentUpdate(document_url="data:application/pdf;base64,JVBE")
+    with pytest.raises(HTTPException) as exc:
+        await main.update_document(str(doc_id), update, Response(), if_match='"1"', current_user={})
+    assert exc.value.status_code == 412
+    assert not await main.blob_store.is_referenced("new")
+
+    async def unavailable(*args, **kwargs):
+        raise AutoReconnect("primary stepped down")
+
+    monkeypatch.setattr(main.document_collection, "find_one_and_update", unavailable)
+    with pytest.raises(AutoReconnect):
+        await main.update_document(str(doc_id), update, Response(), if_match=None, current_user={})
+    assert not await main.blob_store.is_referenced("new")
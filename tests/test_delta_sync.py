@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import main
+from models.models import NewsChanges, NewsInDB
+from scripts.delta_sync import DeltaSync, SyncTokenExpired
+from scripts.pagination import encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_token_returns_only_later_changes_and_tombstones(db):
+    sync = DeltaSync(db.tombstones, settle_ms=0)
+    old = datetime.utcnow() - timedelta(minutes=1)
+    await db.news.insert_many([{"title": "a", "updated_at": old}, {"title": "b", "updated_at": old}])
+
+    rows, deleted, token, has_more = await sync.changes(db.news, "news", None, 10)
+    assert {r["title"] for r in rows} == {"a", "b"} and deleted == [] and not has_more
+
+    # Sin margen (settle_ms=0) los cambios deben caer fuera del milisegundo del token
+    await asyncio.sleep(0.01)
+
+    await db.news.update_one({"title": "a"}, {"$set": {"title": "a2", "updated_at": datetime.utcnow()}})
+    gone = await db.news.find_one_and_delete({"title": "b"})
+    await sync.record_deletion("news", str(gone["_id"]))
+    await sync.record_deletion("documents", str(ObjectId()))
+
+    rows, deleted, token, has_more = await sync.changes(db.news, "news", token, 10)
+    assert [r["title"] for r in rows] == ["a2"]
+    assert deleted == [str(gone["_id"])]
+
+    rows, deleted, _, _ = await sync.changes(db.news, "news", token, 10)
+    assert rows == [] and deleted == []
+
+
+async def test_expired_token(db):
+    sync = DeltaSync(db.tombstones, ttl_s=60)
+    token = encode_cursor(datetime.utcnow() - timedelta(minutes=5), ObjectId())
+    with pytest.raises(SyncTokenExpired):
+        await sync.changes(db.news, "news", token, 10)
+
+
+@pytest.mark.parametrize("token", ["garbage", encode_cursor("Estación", ObjectId())])
+async def test_foreign_token_is_rejected_with_400(db, monkeypatch, token):
+    monkeypatch.setattr(main, "delta_sync", DeltaSync(db.tombstones))
+    with pytest.raises(HTTPException) as exc:
+        await main.sync_page(NewsChanges, NewsInDB, db.news, "news", token, 10)
+    assert exc.value.status_code == 400
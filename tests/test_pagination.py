@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from scripts.pagination import decode_cursor, encode_cursor, fetch_page
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trip():
+    doc_id = ObjectId()
+    when = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(when, doc_id)) == (when, doc_id)
+    assert decode_cursor(encode_cursor("Estación 1", doc_id)) == ("Estación 1", doc_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "eyJ0IjoicyJ9"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+async def test_pages_cover_every_document_once(db):
+    # Fechas repetidas: el _id desempata dentro del mismo valor de orden
+    base = datetime(2024, 1, 1)
+    await db.news.insert_many([{"created_at": base + timedelta(days=i // 3), "n": i} for i in range(10)])
+
+    seen, cursor = [], None
+    while True:
+        docs, cursor = await fetch_page(db.news, {}, "created_at", True, cursor, 4)
+        seen.extend(doc["_id"] for doc in docs)
+        if cursor is None:
+            break
+
+    expected = await db.news.find().sort([("created_at", -1), ("_id", -1)]).to_list(length=None)
+    assert seen == [doc["_id"] for doc in expected]
@@ -0,0 +1,34 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+
+import main
+from models.models import NewsUpdate
+from scripts.versioning import match_filter, parse_if_match
+
+pytestmark = pytest.mark.anyio
+
+
+def test_parse_if_match():
+    assert parse_if_match(None) is None
+    assert parse_if_match("*") is None
+    assert parse_if_match('"3", "4-gzip"') == [3, 4]
+    assert parse_if_match('W/"3"') == []
+
+
+async def test_stale_version_is_rejected_with_412(db, monkeypatch):
+    monkeypatch.setattr(main, "news_collection", db.news)
+    news_id = ObjectId()
+    await db.news.insert_one({"_id": news_id, "title": "a", "category": "c", "content": "x", "version": 2})
+
+    with pytest.raises(HTTPException) as exc:
+        await main.update_news(str(news_id), NewsUpdate(title="b"), Response(), if_match='"1"', current_user={})
+    assert exc.value.status_code == 412
+    assert (await db.news.find_one({"_id": news_id}))["title"] == "a"
+
+
+async def test_missing_document_is_not_a_conflict(db):
+    doc_id = ObjectId()
+    assert await db.news.find_one(match_filter(doc_id, [1])) is None
+    # Sin documento raise_if_conflict no decide: el llamador responde 404
+    await main.raise_if_conflict(db.news, doc_id, [1])